@@ -1,6 +1,84 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import actions as admin_actions
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+from django.utils.functional import cached_property
 
-from apps.library import models
+from apps.library import deletions, models
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который для нефильтрованной большой таблицы PostgreSQL
+    берёт число строк из статистики планировщика вместо `COUNT(*)`.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+        if query is not None and not query.where and not query.distinct:
+            connection = connections[queryset.db]
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                        [connection.ops.quote_name(queryset.model._meta.db_table)]
+                    )
+                    row = cursor.fetchone()
+                if row is not None and row[0] >= self.exact_count_threshold:
+                    return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Базовая админка для больших таблиц: оценка числа строк без повторного `COUNT(*)`."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("-id",)
+
+
+class BackgroundDeleteAdminMixin:
+    """Миксин админки, удаляющий объекты фоновым заданием `deletions`.
+
+    Страница подтверждения не собирает все зависимые отзывы и рейтинги,
+    а сообщение после удаления говорит, что оно только запущено.
+    """
+    schedule_deletion = None
+    actions = ["delete_selected"]
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], dict(), set(), []
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.schedule_deletion(obj)
+
+    def response_delete(self, request, obj_display, obj_id):
+        self.message_user(request, f"Удаление «{obj_display}» запущено в фоне.", messages.SUCCESS)
+        opts = self.model._meta
+        return HttpResponseRedirect(
+            reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist", current_app=self.admin_site.name)
+        )
+
+    def delete_selected(self, request, queryset):
+        """Стандартное действие удаления, которое только запускает фоновые задания."""
+        if not request.POST.get("post"):
+            return admin_actions.delete_selected(self, request, queryset)
+        if not self.has_delete_permission(request):
+            raise PermissionDenied
+        objs = list(queryset)
+        self.delete_queryset(request, objs)
+        self.message_user(request, f"Запущено фоновое удаление объектов: {len(objs)}.", messages.SUCCESS)
+
+    delete_selected.allowed_permissions = ("delete",)
+    delete_selected.short_description = admin_actions.delete_selected.short_description
 
 
 @admin.register(models.BookAuthorModel)
@@ -8,6 +86,7 @@ class BookAuthorAdmin(admin.ModelAdmin):
     """Админка автора книги."""
     list_display = ("id", "name")
     list_display_links = ("id", "name")
+    search_fields = ("^name",)
 
 
 @admin.register(models.BookGenreModel)
@@ -15,11 +94,13 @@ class BookGenreAdmin(admin.ModelAdmin):
     """Админка жанра книги."""
     list_display = ("id", "title")
     list_display_links = ("id", "title")
+    search_fields = ("^title",)
 
 
 @admin.register(models.BookModel)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(BackgroundDeleteAdminMixin, LargeTableAdmin):
     """Админка книги."""
+    schedule_deletion = staticmethod(deletions.schedule_book)
     list_display = (
         "id", "title", "genre", "author",
         "release_year", "books_count"
@@ -28,17 +109,42 @@ class BookAdmin(admin.ModelAdmin):
         "id", "title", "genre", "author",
         "release_year", "books_count"
     )
+    list_select_related = ("genre", "author")
+    list_filter = ("genre", "release_year", "hidden")
+    search_fields = ("^title",)
+    autocomplete_fields = ("author", "genre")
 
 
 @admin.register(models.BookReviewModel)
-class BookReviewAdmin(admin.ModelAdmin):
+class BookReviewAdmin(LargeTableAdmin):
     """Админка отзыва книги."""
     list_display = ("id", "user", "book")
     list_display_links = ("id", "user", "book")
+    list_select_related = ("user", "book")
+    autocomplete_fields = ("book",)
+    raw_id_fields = ("user",)
 
 
 @admin.register(models.BookRatingModel)
-class BookRatingAdmin(admin.ModelAdmin):
+class BookRatingAdmin(LargeTableAdmin):
     """Админка рейтинга книги."""
     list_display = ("id", "rating", "user", "book")
     list_display_links = ("id", "rating", "user", "book")
+    list_select_related = ("user", "book")
+    autocomplete_fields = ("book",)
+    raw_id_fields = ("user",)
+
+
+@admin.register(models.OutboxEventModel)
+class OutboxEventAdmin(LargeTableAdmin):
+    """Админка события исходящей очереди."""
+    list_display = ("id", "topic", "created_at", "attempts", "processed_at")
+    list_display_links = ("id", "topic")
+
+
+@admin.register(models.DeletionJobModel)
+class DeletionJobAdmin(admin.ModelAdmin):
+    """Админка фонового удаления."""
+    list_display = ("id", "kind", "object_id", "status", "reviews_deleted", "ratings_deleted", "created_at")
+    list_display_links = ("id", "kind", "object_id")
+    list_filter = ("kind", "status")
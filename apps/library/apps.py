@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LibraryConfig(AppConfig):
     name = "apps.library"
     verbose_name = "Библиотека"
+
+    def ready(self):
+        from apps.library import book_cards, deletions, signals  # noqa: F401
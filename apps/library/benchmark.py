@@ -0,0 +1,193 @@
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client
+
+from rest_framework.authtoken.models import Token
+
+from apps.library import models
+
+
+def generate_dataset(authors=50, genres=20, books=500, users=100, ratings=5000, reviews=2000,
+                     seed=0) -> dict:
+    """Наполняет базу случайными авторами, жанрами, книгами, юзерами, рейтингами и отзывами.
+
+    Возвращает первичные ключи созданных объектов и токены юзеров.
+    """
+    rnd = random.Random(seed)
+    password = make_password("bench_password")
+
+    models.UserModel.objects.bulk_create(
+        models.UserModel(username=f"bench_user{i}", password=password) for i in range(users)
+    )
+    user_ids = list(
+        models.UserModel.objects.filter(username__startswith="bench_user").values_list("pk", flat=True)
+    )
+    Token.objects.bulk_create(Token(key=Token.generate_key(), user_id=pk) for pk in user_ids)
+    tokens = list(Token.objects.filter(user_id__in=user_ids).values_list("key", flat=True))
+
+    models.BookAuthorModel.objects.bulk_create(
+        models.BookAuthorModel(name=f"Bench author {i}") for i in range(authors)
+    )
+    models.BookGenreModel.objects.bulk_create(
+        models.BookGenreModel(title=f"Bench genre {i}") for i in range(genres)
+    )
+    author_ids = list(
+        models.BookAuthorModel.objects.filter(name__startswith="Bench author").values_list("pk", flat=True)
+    )
+    genre_ids = list(
+        models.BookGenreModel.objects.filter(title__startswith="Bench genre").values_list("pk", flat=True)
+    )
+
+    models.BookModel.objects.bulk_create(
+        models.BookModel(
+            title=f"Bench book {i}", release_year=rnd.randint(1900, 2021),
+            books_count=rnd.randint(0, 20), description="Описание книги. " * rnd.randint(5, 50),
+            author_id=rnd.choice(author_ids), genre_id=rnd.choice(genre_ids)
+        )
+        for i in range(books)
+    )
+    book_ids = list(
+        models.BookModel.objects.filter(title__startswith="Bench book").values_list("pk", flat=True)
+    )
+
+    pairs = set()
+    ratings = min(ratings, len(book_ids) * len(user_ids))
+    while len(pairs) < ratings:
+        pairs.add((rnd.choice(book_ids), rnd.choice(user_ids)))
+    models.BookRatingModel.objects.bulk_create(
+        (
+            models.BookRatingModel(book_id=book_id, user_id=user_id, rating=rnd.randint(1, 10))
+            for book_id, user_id in pairs
+        ),
+        batch_size=1000
+    )
+    models.BookReviewModel.objects.bulk_create(
+        (
+            models.BookReviewModel(
+                book_id=rnd.choice(book_ids), user_id=rnd.choice(user_ids),
+                review="Отзыв о книге. " * rnd.randint(1, 20)
+            )
+            for _ in range(reviews)
+        ),
+        batch_size=1000
+    )
+    return {"book_ids": book_ids, "tokens": tokens}
+
+
+def book_list(client, rnd, dataset):
+    return client.get("/api/v1/books/")
+
+
+def book_detail(client, rnd, dataset):
+    return client.get(f"/api/v1/books/{rnd.choice(dataset['book_ids'])}/")
+
+
+def rating_upsert(client, rnd, dataset):
+    return client.post(
+        "/api/v1/ratings/",
+        {"book": rnd.choice(dataset["book_ids"]), "rating": rnd.randint(1, 10)},
+        HTTP_AUTHORIZATION=f"Token {rnd.choice(dataset['tokens'])}"
+    )
+
+
+def review_list(client, rnd, dataset):
+    return client.get("/api/v1/reviews/")
+
+
+def change_count(client, rnd, dataset):
+    return client.patch(
+        f"/api/v1/books/{rnd.choice(dataset['book_ids'])}/change-count/",
+        {"value": 1}, content_type="application/json",
+        HTTP_AUTHORIZATION=f"Token {rnd.choice(dataset['tokens'])}"
+    )
+
+
+SCENARIOS = {
+    "book-list": book_list,
+    "book-detail": book_detail,
+    "rating-upsert": rating_upsert,
+    "review-list": review_list,
+    "change-count": change_count,
+}
+
+
+def get_percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+def run_scenario(scenario, dataset, requests=200, concurrency=4, seed=0) -> dict:
+    """Выполняет `requests` запросов сценария в `concurrency` потоках и возвращает его показатели.
+
+    Потоков не больше, чем запросов, остаток от деления достаётся первым потокам.
+    """
+    workers = max(1, min(concurrency, requests))
+    timings = []
+    queries = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(worker_index):
+        client = Client(raise_request_exception=False)
+        rnd = random.Random(seed + worker_index)
+        try:
+            for _ in range(requests // workers + (worker_index < requests % workers)):
+                started = time.perf_counter()
+                response = scenario(client, rnd, dataset)
+                duration = time.perf_counter() - started
+                counter = getattr(response.wsgi_request, "query_counter", None)
+                with lock:
+                    timings.append(duration)
+                    queries.append(counter.count if counter is not None else 0)
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(worker, range(workers)))
+    elapsed = time.perf_counter() - started
+
+    if not timings:
+        return {
+            "requests": 0, "errors": 0, "rps": 0.0,
+            "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "queries_per_request": 0.0,
+        }
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "errors": len(errors),
+        "rps": round(len(timings) / elapsed, 2),
+        "p50_ms": round(get_percentile(timings, 50) * 1000, 2),
+        "p95_ms": round(get_percentile(timings, 95) * 1000, 2),
+        "p99_ms": round(get_percentile(timings, 99) * 1000, 2),
+        "queries_per_request": round(statistics.mean(queries), 2),
+    }
+
+
+def compare_results(baseline: dict, results: dict, tolerance: float) -> list:
+    """Возвращает список регрессий результатов относительно базовой линии."""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['rps']} -> {result['rps']} rps")
+        if result["queries_per_request"] > base["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries per request "
+                f"{base['queries_per_request']} -> {result['queries_per_request']}"
+            )
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+    return regressions
@@ -0,0 +1,161 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from apps.library import catalog, metrics, single_flight
+
+
+# Поколения: список зависит от всех книг и названий авторов/жанров, карточка — от своей книги и названий,
+# отзывы на странице книги — ещё и от своего поколения, которое не трогает ленту изменений
+LIST_GENERATION_KEY = "books:generation"
+NAMES_GENERATION_KEY = "books:names-generation"
+
+
+def get_cache():
+    if settings.BOOK_CACHE_ALIAS:
+        return caches[settings.BOOK_CACHE_ALIAS]
+    return None
+
+
+def get_book_generation_key(book_id) -> str:
+    return f"books:generation:{book_id}"
+
+
+def get_reviews_generation_key(book_id) -> str:
+    return f"books:reviews-generation:{book_id}"
+
+
+def get_generation(cache, keys) -> tuple:
+    """Текущие поколения по ключам, сброшенные заводятся заново."""
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+_seen_names_generation = None
+
+
+def sync_catalog(names_generation):
+    """Перезагружает каталог воркера, впервые увидев новое поколение названий.
+
+    Иначе воркер пересчитал бы книги со старыми названиями из своего каталога
+    и сохранил бы их под новым поколением на весь `BOOK_CACHE_TTL`.
+    """
+    global _seen_names_generation
+    if names_generation != _seen_names_generation:
+        catalog.invalidate()
+        _seen_names_generation = names_generation
+
+
+def get_names_generation(cache, keys) -> tuple:
+    """Поколения по ключам вместе с поколением названий, с каталогом воркера не старше него."""
+    generation = get_generation(cache, [*keys, NAMES_GENERATION_KEY])
+    sync_catalog(generation[-1])
+    return generation
+
+
+def get_params_digest(request) -> str:
+    """Хэш параметров, от которых зависит представление книги."""
+    params = "&".join(f"{name}={request.query_params.get(name, '')}" for name in ("fields", "expand"))
+    return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+
+def get_detail_key(book_id, request) -> str:
+    return f"books:detail:{book_id}:{get_params_digest(request)}"
+
+
+def get_list(request, compute):
+    """Данные списка книг для параметров запроса, пересчитываемые одним процессом."""
+    cache = get_cache()
+    return single_flight.get_or_compute(
+        cache, f"books:list:{get_params_digest(request)}", compute,
+        settings.BOOK_CACHE_TTL, settings.BOOK_CACHE_STALE_TTL,
+        generation=get_names_generation(cache, [LIST_GENERATION_KEY]), name="book-list"
+    )
+
+
+def get_detail(book_id, request, compute):
+    """Данные книги для параметров запроса, пересчитываемые одним процессом."""
+    cache = get_cache()
+    return single_flight.get_or_compute(
+        cache, get_detail_key(book_id, request), compute,
+        settings.BOOK_CACHE_TTL, settings.BOOK_CACHE_STALE_TTL,
+        generation=get_names_generation(cache, [get_book_generation_key(book_id)]), name="book-detail"
+    )
+
+
+def get_section(book_id, section: str, compute):
+    """Публичная секция страницы книги, пересчитываемая одним процессом при изменении книги."""
+    cache = get_cache()
+    generation_keys = [get_book_generation_key(book_id)]
+    if section == "reviews":
+        generation_keys.append(get_reviews_generation_key(book_id))
+    return single_flight.get_or_compute(
+        cache, f"books:{section}:{book_id}", compute,
+        settings.BOOK_CACHE_TTL, settings.BOOK_CACHE_STALE_TTL,
+        generation=get_names_generation(cache, generation_keys), name=f"book-{section}"
+    )
+
+
+def get_many_details(book_ids, request, compute) -> dict:
+    """Данные книг `{id: data}`: свежие берутся из записей карточек книг,
+    остальные считаются одним вызовом `compute(ids)` и записываются туда же.
+    """
+    cache = get_cache()
+    *generations, names_generation = get_names_generation(
+        cache, [get_book_generation_key(book_id) for book_id in book_ids]
+    )
+    generations = {
+        book_id: (generation, names_generation) for book_id, generation in zip(book_ids, generations)
+    }
+    keys = {book_id: get_detail_key(book_id, request) for book_id in book_ids}
+    entries = cache.get_many(list(keys.values()))
+
+    data = dict()
+    for book_id in book_ids:
+        entry = entries.get(keys[book_id])
+        if single_flight.is_fresh(entry, generations[book_id]):
+            data[book_id] = entry["value"]
+    metrics.observe_cache("book-detail", True, len(data))
+    metrics.observe_cache("book-detail", False, len(book_ids) - len(data))
+    metrics.observe_single_flight("book-detail", "hit", len(data))
+
+    missing_ids = [book_id for book_id in book_ids if book_id not in data]
+    if missing_ids:
+        computed = compute(missing_ids)
+        cache.set_many({
+            keys[book_id]: single_flight.make_entry(value, generations[book_id], settings.BOOK_CACHE_TTL)
+            for book_id, value in computed.items()
+        }, settings.BOOK_CACHE_TTL + settings.BOOK_CACHE_STALE_TTL)
+        metrics.observe_single_flight("book-detail", "computed", len(computed))
+        data.update(computed)
+    return data
+
+
+def invalidate_books(book_ids):
+    """Помечает устаревшими списки и карточки книг после коммита транзакции."""
+    cache = get_cache()
+    if cache is not None:
+        keys = [LIST_GENERATION_KEY, *(get_book_generation_key(book_id) for book_id in book_ids)]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_reviews(book_ids):
+    """Помечает устаревшими отзывы на страницах книг после коммита транзакции."""
+    cache = get_cache()
+    if cache is not None:
+        keys = [get_reviews_generation_key(book_id) for book_id in book_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_names():
+    """Помечает устаревшими все закэшированные книги после смены автора/жанра."""
+    cache = get_cache()
+    if cache is not None:
+        transaction.on_commit(lambda: cache.delete_many([LIST_GENERATION_KEY, NAMES_GENERATION_KEY]))
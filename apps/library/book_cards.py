@@ -0,0 +1,82 @@
+from django.db import connections, transaction
+from django.db.models import Q
+
+from apps.library import catalog, models, outbox, serializers
+from apps.library.renderers import ORJSONRenderer
+
+
+def render_cards(book_ids) -> dict:
+    """JSON книг `{id: str}` в представлении по умолчанию, как его отдаёт рендерер списка."""
+    queryset = serializers.BookReadSerializer.prepare_queryset(
+        models.BookModel.objects.visible().filter(pk__in=book_ids), None
+    )
+    data = serializers.BookReadSerializer(queryset, many=True, context={"user_ratings": dict()}).data
+    renderer = ORJSONRenderer()
+    return {item["id"]: renderer.render(item).decode() for item in data}
+
+
+def rebuild(book_ids):
+    """Пересобирает карточки книг, у удалённых книг карточек не остаётся."""
+    book_ids = set(book_ids)
+    if not book_ids:
+        return
+    cards = render_cards(book_ids)
+    with transaction.atomic():
+        models.BookCardModel.objects.filter(book_id__in=book_ids).delete()
+        models.BookCardModel.objects.bulk_create(
+            models.BookCardModel(book_id=book_id, data=data) for book_id, data in cards.items()
+        )
+
+
+def rebuild_all(batch_size=1000) -> int:
+    """Пересобирает карточки всех книг пачками и возвращает их количество."""
+    book_ids = list(models.BookModel.objects.visible().order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(book_ids), batch_size):
+        rebuild(book_ids[start:start + batch_size])
+    return len(book_ids)
+
+
+def get_list_json():
+    """JSON-список всех книг из готовых карточек или None, если карточки есть не у всех книг.
+
+    На PostgreSQL список склеивается в базе одним `string_agg`, без объектов на строку.
+    """
+    connection = connections[models.BookModel.objects.db]
+    if connection.vendor == "postgresql":
+        book_table = connection.ops.quote_name(models.BookModel._meta.db_table)
+        card_table = connection.ops.quote_name(models.BookCardModel._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT string_agg(card.data, ',' ORDER BY book.id), count(*) - count(card.data) "
+                f"FROM {book_table} book LEFT JOIN {card_table} card ON card.book_id = book.id "
+                f"WHERE NOT book.hidden"
+            )
+            cards, missing = cursor.fetchone()
+        if missing:
+            return None
+    else:
+        cards = list(models.BookModel.objects.visible().order_by("pk").values_list("card__data", flat=True))
+        if None in cards:
+            return None
+        cards = ",".join(cards)
+    return b"[" + (cards or "").encode() + b"]"
+
+
+@outbox.handler("book.changed", "rating.changed", "rating.deleted", "review.changed", "review.deleted")
+def rebuild_changed_books(events):
+    rebuild(event.payload["book_id"] for event in events)
+
+
+@outbox.handler("author.changed", "genre.changed")
+def rebuild_author_genre_books(events):
+    """Пересобирает книги авторов/жанров с новыми названиями.
+
+    Каталог воркера сбрасывается: сигнал изменения сбросил его только в процессе записи.
+    """
+    catalog.invalidate()
+    author_ids = [event.payload["author_id"] for event in events if "author_id" in event.payload]
+    genre_ids = [event.payload["genre_id"] for event in events if "genre_id" in event.payload]
+    book_ids = models.BookModel.objects \
+        .filter(Q(author_id__in=author_ids) | Q(genre_id__in=genre_ids)) \
+        .values_list("pk", flat=True)
+    rebuild(book_ids)
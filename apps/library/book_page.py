@@ -0,0 +1,87 @@
+import functools
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import Http404
+
+from apps.library import book_cache, catalog, models, serializers, user_ratings
+
+
+def load_book(book_id) -> dict:
+    """Книга в представлении по умолчанию и id её автора."""
+    book = serializers.BookReadSerializer \
+        .prepare_queryset(models.BookModel.objects.visible().filter(pk=book_id), None) \
+        .first()
+    if book is None:
+        raise Http404
+    data = serializers.BookReadSerializer(book, context={"user_ratings": dict()}).data
+    return {"data": data, "author_id": book["author_id"]}
+
+
+def load_stats(book_id) -> dict:
+    """Распределение оценок книги."""
+    counts = dict(
+        models.BookRatingModel.objects
+        .filter(book_id=book_id)
+        .order_by()
+        .values_list("rating")
+        .annotate(count=Count("pk"))
+    )
+    return {
+        "ratings_count": sum(counts.values()),
+        "ratings": {str(rating): counts.get(rating, 0) for rating in range(1, 11)},
+    }
+
+
+def load_reviews(book_id) -> dict:
+    """Первая страница отзывов книги, новые сначала."""
+    limit = settings.BOOK_PAGE_REVIEWS
+    queryset = serializers.BookReviewReadSerializer.prepare_queryset(
+        models.BookReviewModel.objects.filter(book_id=book_id).order_by("-id"), None
+    )
+    reviews = list(queryset[:limit + 1])
+    return {
+        "results": serializers.BookReviewReadSerializer(reviews[:limit], many=True).data,
+        "has_more": len(reviews) > limit,
+    }
+
+
+def load_user_state(book_id, user):
+    """Оценка и отзывы текущего юзера, None для анонима."""
+    if not user.is_authenticated:
+        return None
+    return {
+        "rating": user_ratings.get_user_ratings(user).get(book_id),
+        "review_ids": list(
+            models.BookReviewModel.objects
+            .filter(book_id=book_id, user=user)
+            .order_by("id")
+            .values_list("pk", flat=True)
+        ),
+    }
+
+
+# Общие для всех юзеров секции кэшируются в `BOOK_CACHE_ALIAS`, если он задан
+PUBLIC_SECTIONS = {
+    "book": load_book,
+    "stats": load_stats,
+    "reviews": load_reviews,
+}
+
+
+def get_page(book_id, request) -> dict:
+    """Страница книги: книга, автор, статистика оценок, первые отзывы и состояние юзера."""
+    use_cache = book_cache.get_cache() is not None
+    sections = dict()
+    for name, load in PUBLIC_SECTIONS.items():
+        compute = functools.partial(load, book_id)
+        sections[name] = book_cache.get_section(book_id, name, compute) if use_cache else compute()
+
+    book = sections.pop("book")
+    author_id = book["author_id"]
+    return {
+        "book": book["data"],
+        "author": {"id": author_id, "name": catalog.get_name(models.BookAuthorModel, author_id)},
+        **sections,
+        "user": load_user_state(book_id, request.user),
+    }
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import CharField, Sum, Value
+
+from apps.library import models
+
+
+# Модель -> поле с названием, которое выводится в книгах
+NAME_FIELDS = {
+    models.BookAuthorModel: "name",
+    models.BookGenreModel: "title",
+}
+
+
+def get_version():
+    """Общая для всех процессов версия авторов и жанров.
+
+    Любое закоммиченное изменение заменяет запись объекта в ленте записью с большим номером,
+    поэтому сумма номеров растёт независимо от порядка коммитов транзакций.
+    """
+    return models.CatalogChangeModel.objects \
+        .filter(kind__in=(models.CatalogChangeModel.KIND_AUTHOR, models.CatalogChangeModel.KIND_GENRE)) \
+        .aggregate(version=Sum("seq"))["version"]
+
+
+def load_names() -> dict:
+    """Названия всех авторов и жанров `{model: {id: name}}` одним запросом."""
+    querysets = [
+        model.objects
+        .annotate(model_label=Value(model._meta.label, output_field=CharField()))
+        .values_list("id", name_field, "model_label")
+        for model, name_field in NAME_FIELDS.items()
+    ]
+    models_by_label = {model._meta.label: model for model in NAME_FIELDS}
+    names = {model: dict() for model in NAME_FIELDS}
+    for pk, name, label in querysets[0].union(*querysets[1:], all=True):
+        names[models_by_label[label]][pk] = name
+    return names
+
+
+class Catalog:
+    """Авторы и жанры в памяти воркера.
+
+    Версия сверяется с базой не чаще раза в `LOCAL_CATALOG_CHECK_INTERVAL` секунд,
+    при расхождении каталог загружается заново. Неизвестный id перезагружает каталог сразу.
+    """
+
+    def __init__(self):
+        self.names = None
+        self.version = None
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.names is not None \
+                    and now - self.checked_at < settings.LOCAL_CATALOG_CHECK_INTERVAL:
+                return self.names
+            version = get_version()
+            if force or self.names is None or version != self.version:
+                self.names = load_names()
+                self.version = version
+            self.checked_at = now
+            return self.names
+
+    def get_names(self, model) -> dict:
+        names = self.names
+        if names is None or time.monotonic() - self.checked_at >= settings.LOCAL_CATALOG_CHECK_INTERVAL:
+            names = self.refresh()
+        return names[model]
+
+    def get_name(self, model, pk):
+        """Название автора/жанра или None, если такого нет в базе."""
+        name = self.get_names(model).get(pk)
+        if name is None:
+            name = self.refresh(force=True)[model].get(pk)
+        return name
+
+    def get_instance(self, model, pk):
+        """Автор/жанр из каталога без запроса к базе или None."""
+        name = self.get_name(model, pk)
+        if name is None:
+            return None
+        return model.from_db(None, ["id", NAME_FIELDS[model]], [pk, name])
+
+    def invalidate(self):
+        with self._lock:
+            self.names = None
+
+
+_catalog = Catalog()
+
+get_name = _catalog.get_name
+get_instance = _catalog.get_instance
+invalidate = _catalog.invalidate
+
@@ -0,0 +1,105 @@
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from apps.library import models, serializers
+
+
+def record(kind: str, object_ids, deleted=False):
+    """Записывает изменение объектов в ленту, заменяя их прежние записи.
+
+    На PostgreSQL это один `INSERT ... ON CONFLICT`, который выдаёт записи новый номер
+    и запоминает текущую транзакцию. На остальных базах записи пересоздаются:
+    запись там идёт в одну транзакцию за раз.
+    """
+    object_ids = sorted(set(object_ids))
+    if not object_ids:
+        return
+    queryset = models.CatalogChangeModel.objects
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        table = connection.ops.quote_name(models.CatalogChangeModel._meta.db_table)
+        values = ", ".join(["(%s, %s, %s, %s, txid_current())"] * len(object_ids))
+        params = [param for object_id in object_ids for param in (kind, object_id, deleted, timezone.now())]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (kind, object_id, deleted, changed_at, txid) VALUES {values} "
+                f"ON CONFLICT (kind, object_id) DO UPDATE SET "
+                f"seq = nextval(pg_get_serial_sequence('{table}', 'seq')), "
+                f"deleted = EXCLUDED.deleted, changed_at = EXCLUDED.changed_at, txid = EXCLUDED.txid",
+                params
+            )
+    else:
+        queryset.filter(kind=kind, object_id__in=object_ids).delete()
+        queryset.bulk_create(
+            models.CatalogChangeModel(kind=kind, object_id=object_id, deleted=deleted)
+            for object_id in object_ids
+        )
+
+
+def parse_token(token: str) -> tuple:
+    """Позиция в ленте `(txid, seq)` из токена `<txid>.<seq>`.
+
+    Токен прежнего формата — только номер: записи до перехода на `txid` лежат с `txid` 0.
+    """
+    txid, _, seq = token.rpartition(".")
+    return int(txid or 0), int(seq)
+
+
+def format_token(position: tuple) -> str:
+    return "%d.%d" % position
+
+
+READ_SERIALIZERS = {
+    models.CatalogChangeModel.KIND_BOOK: (
+        models.BookModel.objects.visible(), serializers.BookReadSerializer
+    ),
+    models.CatalogChangeModel.KIND_AUTHOR: (
+        models.BookAuthorModel.objects.all(), serializers.BookAuthorReadSerializer
+    ),
+    models.CatalogChangeModel.KIND_GENRE: (
+        models.BookGenreModel.objects.all(), serializers.BookGenreReadSerializer
+    ),
+}
+
+
+def get_changes(since: tuple, limit: int, request) -> dict:
+    """Возвращает изменения после позиции `since` в порядке `(txid, seq)`.
+
+    На PostgreSQL отдаются только записи транзакций старше самой старой незавершённой:
+    любая транзакция, которая закоммитится позже, получит позицию дальше выданных,
+    сколько бы она ни была открыта. На остальных базах `txid` всегда 0 и порядок — по номеру.
+    """
+    txid, seq = since
+    queryset = models.CatalogChangeModel.objects.filter(Q(txid__gt=txid) | Q(txid=txid, seq__gt=seq))
+    if connections[queryset.db].vendor == "postgresql":
+        queryset = queryset.filter(txid__lt=RawSQL("txid_snapshot_xmin(txid_current_snapshot())", []))
+    entries = list(queryset.order_by("txid", "seq")[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    data_by_kind = dict()
+    for kind, (queryset, serializer_class) in READ_SERIALIZERS.items():
+        object_ids = [entry.object_id for entry in entries if entry.kind == kind and not entry.deleted]
+        if object_ids:
+            queryset = serializer_class.prepare_queryset(
+                queryset.filter(pk__in=object_ids), request
+            )
+            serializer = serializer_class(queryset, many=True, context={"request": request})
+            data_by_kind[kind] = {item["id"]: item for item in serializer.data}
+
+    changes = []
+    for entry in entries:
+        data = data_by_kind.get(entry.kind, dict()).get(entry.object_id)
+        change = {"seq": entry.seq, "type": entry.kind, "id": entry.object_id,
+                  "deleted": entry.deleted or data is None}
+        if data is not None:
+            change["data"] = data
+        changes.append(change)
+
+    return {
+        "changes": changes,
+        "next": format_token((entries[-1].txid, entries[-1].seq) if entries else since),
+        "has_more": has_more,
+    }
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.library import models, outbox
+
+
+BATCH_TOPIC = "deletion.batch"
+
+
+def schedule(kind: str, object_id: int) -> models.DeletionJobModel:
+    """Задание удаления объекта, для уже удаляемого возвращается прежнее."""
+    job, created = models.DeletionJobModel.objects.get_or_create(kind=kind, object_id=object_id)
+    if created:
+        outbox.enqueue(BATCH_TOPIC, {"job_id": job.pk})
+    return job
+
+
+def schedule_book(book) -> models.DeletionJobModel:
+    """Скрывает книгу сразу, её отзывы, рейтинги и саму книгу удаляет воркер исходящей очереди."""
+    with transaction.atomic():
+        book.hidden = True
+        book.save(update_fields=["hidden"])
+        return schedule(models.DeletionJobModel.KIND_BOOK, book.pk)
+
+
+def schedule_user(user) -> models.DeletionJobModel:
+    """Отключает юзера сразу, его отзывы, рейтинги и самого юзера удаляет воркер исходящей очереди."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        return schedule(models.DeletionJobModel.KIND_USER, user.pk)
+
+
+def delete_rows(model, filters: dict, batch_size: int) -> int:
+    """Удаляет до `batch_size` строк и возвращает их количество.
+
+    Сигналы удаления срабатывают на каждую строку, как при удалении по одной:
+    общие рейтинги, кэши и события обновляются в той же транзакции.
+    """
+    ids = list(model.objects.filter(**filters).order_by("pk").values_list("pk", flat=True)[:batch_size])
+    if not ids:
+        return 0
+    _, deleted = model.objects.filter(pk__in=ids).delete()
+    return deleted.get(model._meta.label, 0)
+
+
+def delete_object(job: models.DeletionJobModel):
+    """Удаляет сам объект задания, зависимых строк у него к этому моменту уже нет."""
+    model = models.BookModel if job.kind == job.KIND_BOOK else models.UserModel
+    instance = model.objects.filter(pk=job.object_id).first()
+    if instance is not None:
+        instance.delete()
+
+
+def purge_batch(job: models.DeletionJobModel, batch_size: int) -> bool:
+    """Удаляет пачку отзывов и пачку рейтингов задания, а когда их не осталось — сам объект.
+
+    Возвращает True, если задание завершено.
+    """
+    filters = job.get_dependent_filters()
+    reviews_deleted = delete_rows(models.BookReviewModel, filters, batch_size)
+    ratings_deleted = delete_rows(models.BookRatingModel, filters, batch_size)
+
+    job.reviews_deleted += reviews_deleted
+    job.ratings_deleted += ratings_deleted
+    finished = reviews_deleted < batch_size and ratings_deleted < batch_size
+    if finished:
+        delete_object(job)
+        job.status = job.STATUS_DONE
+        job.finished_at = timezone.now()
+    job.save()
+    return finished
+
+
+@outbox.handler(BATCH_TOPIC)
+def purge_jobs(events):
+    """Пачка на задание за событие, следующая ставится новым событием в отдельную транзакцию.
+
+    Задание, заблокированное другим воркером, ставится в очередь заново, чтобы цепочка не оборвалась.
+    """
+    job_ids = {event.payload["job_id"] for event in events}
+    pending_ids = set(
+        models.DeletionJobModel.objects
+        .filter(pk__in=job_ids, status=models.DeletionJobModel.STATUS_PENDING)
+        .values_list("pk", flat=True)
+    )
+    jobs = models.DeletionJobModel.objects \
+        .select_for_update(skip_locked=True) \
+        .filter(pk__in=pending_ids, status=models.DeletionJobModel.STATUS_PENDING)
+    for job in jobs:
+        pending_ids.discard(job.pk)
+        if not purge_batch(job, settings.DELETION_BATCH_SIZE):
+            outbox.enqueue(BATCH_TOPIC, {"job_id": job.pk})
+    for job_id in pending_ids:
+        outbox.enqueue(BATCH_TOPIC, {"job_id": job_id})
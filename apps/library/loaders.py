@@ -0,0 +1,98 @@
+from django.db import models
+
+from rest_framework import serializers
+
+
+class DataLoader:
+    """Загрузчик значений по ключам пачками: `batch_load(keys) -> {key: value}`.
+
+    Ключи копятся через `prime`, первый `load` загружает все накопленные одним вызовом.
+    Загруженное запоминается, ключей без значения соответствует `default`.
+    """
+
+    def __init__(self, batch_load, default=None):
+        self.batch_load = batch_load
+        self.default = default
+        self.values = dict()
+        self.pending = set()
+
+    def prime(self, keys):
+        self.pending.update(key for key in keys if key not in self.values)
+
+    def load(self, key):
+        if key not in self.values:
+            self.pending.add(key)
+            self.dispatch()
+        return self.values[key]
+
+    def dispatch(self):
+        if not self.pending:
+            return
+        keys = list(self.pending)
+        self.pending.clear()
+        loaded = self.batch_load(keys)
+        for key in keys:
+            self.values[key] = loaded.get(key, self.default)
+
+
+def get_loader(context: dict, batch_load, default=None) -> DataLoader:
+    """Загрузчик `batch_load`, общий для всех сериализаторов запроса (без запроса — контекста)."""
+    request = context.get("request")
+    if request is not None:
+        if getattr(request, "data_loaders", None) is None:
+            request.data_loaders = dict()
+        loaders = request.data_loaders
+    else:
+        loaders = context.setdefault("data_loaders", dict())
+    if batch_load not in loaders:
+        loaders[batch_load] = DataLoader(batch_load, default)
+    return loaders[batch_load]
+
+
+class BatchLoadListSerializer(serializers.ListSerializer):
+    """Список, который до сериализации собирает ключи связей всех элементов."""
+
+    @staticmethod
+    def get_items(data) -> list:
+        return list(data.all() if isinstance(data, models.Manager) else data)
+
+    def to_representation(self, data):
+        iterable = self.get_items(data)
+        self.child.prime_batch_loads(iterable)
+        return [self.child.to_representation(item) for item in iterable]
+
+
+class BatchLoadMixin:
+    """Миксин сериализатора со связями, загружаемыми одним `IN`-запросом на весь ответ.
+
+    Связи объявляются как `batch_loads = {name: (key_attr, batch_load)}`
+    и читаются в `to_representation` через `self.load(name, instance)`.
+    Вложенные сериализаторы с этим миксином собирают ключи вместе с родителем.
+    Для списка нужен `Meta.list_serializer_class = BatchLoadListSerializer`.
+    """
+    batch_loads = dict()
+
+    def get_batch_loader(self, name) -> DataLoader:
+        _, batch_load = self.batch_loads[name]
+        return get_loader(self.context, batch_load)
+
+    def load(self, name, instance):
+        key_attr, _ = self.batch_loads[name]
+        return self.get_batch_loader(name).load(getattr(instance, key_attr))
+
+    def prime_batch_loads(self, instances):
+        for name, (key_attr, _) in self.batch_loads.items():
+            self.get_batch_loader(name).prime(getattr(instance, key_attr) for instance in instances)
+
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, BatchLoadListSerializer):
+                nested = [
+                    item for instance in instances
+                    for item in BatchLoadListSerializer.get_items(field.get_attribute(instance))
+                ]
+                field.child.prime_batch_loads(nested)
+            elif isinstance(field, BatchLoadMixin):
+                nested = [field.get_attribute(instance) for instance in instances]
+                field.prime_batch_loads([item for item in nested if item is not None])
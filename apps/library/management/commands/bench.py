@@ -0,0 +1,100 @@
+import json
+import platform
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from apps.library import benchmark
+
+
+class Command(BaseCommand):
+    help = "Нагрузочные сценарии API на отдельной тестовой базе со сравнением с базовой линией."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--baseline", default=str(settings.BASE_DIR / "benchmarks" / "baseline.json"),
+            help="JSON с базовой линией для сравнения."
+        )
+        parser.add_argument(
+            "--save", action="store_true",
+            help="Сохранить результаты как новую базовую линию вместо сравнения."
+        )
+        parser.add_argument("--output", help="Куда дополнительно записать результаты.")
+        parser.add_argument(
+            "--scenario", action="append", choices=list(benchmark.SCENARIOS),
+            help="Запускаемые сценарии, по умолчанию все."
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--tolerance", type=float, default=0.2)
+        parser.add_argument("--seed", type=int, default=0)
+        for name, default in (
+            ("authors", 50), ("genres", 20), ("books", 500),
+            ("users", 100), ("ratings", 5000), ("reviews", 2000),
+        ):
+            parser.add_argument(f"--{name}", type=int, default=default)
+
+    def handle(self, *args, **options):
+        dataset_options = {
+            name: options[name]
+            for name in ("authors", "genres", "books", "users", "ratings", "reviews", "seed")
+        }
+        if connection.vendor == "sqlite" and options["concurrency"] > 1:
+            # Общая in-memory база SQLite не допускает параллельной записи.
+            self.stdout.write(self.style.WARNING("SQLite: running scenarios in a single thread"))
+            options["concurrency"] = 1
+
+        old_database_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            dataset = benchmark.generate_dataset(**dataset_options)
+            results = {
+                "meta": {
+                    "dataset": dataset_options,
+                    "requests": options["requests"],
+                    "concurrency": options["concurrency"],
+                    "database": connection.vendor,
+                    "python": platform.python_version(),
+                },
+                "scenarios": dict(),
+            }
+            for name in options["scenario"] or benchmark.SCENARIOS:
+                # Все запросы идут с одного IP, ограничение записи исказило бы результаты.
+                with override_settings(THROTTLE_ENABLED=False):
+                    result = benchmark.run_scenario(
+                        benchmark.SCENARIOS[name], dataset, options["requests"],
+                        options["concurrency"], options["seed"]
+                    )
+                results["scenarios"][name] = result
+                self.stdout.write(
+                    f"{name}: {result['rps']} rps, p50 {result['p50_ms']} ms, "
+                    f"p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+                    f"{result['queries_per_request']} queries/request, {result['errors']} errors"
+                )
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+        if options["output"]:
+            self.write_results(Path(options["output"]), results)
+
+        baseline_path = Path(options["baseline"])
+        if options["save"]:
+            self.write_results(baseline_path, results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}, run with --save"))
+            return
+        baseline = json.loads(baseline_path.read_text())
+        regressions = benchmark.compare_results(baseline, results, options["tolerance"])
+        if regressions:
+            raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def write_results(self, path, results):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
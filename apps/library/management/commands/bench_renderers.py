@@ -0,0 +1,69 @@
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.library import models, views
+from apps.library.parsers import ORJSONParser
+from apps.library.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Сравнивает JSONRenderer и ORJSONRenderer на ответе /api/v1/books/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, nargs="+", default=[1000, 10000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for books_count in options["books"]:
+            with transaction.atomic():
+                data = self.get_book_list_data(books_count)
+                self.report(books_count, data, options["repeat"])
+                transaction.set_rollback(True)
+
+    def get_book_list_data(self, books_count):
+        """Наполняет базу книгами и возвращает данные ответа списка книг."""
+        author = models.BookAuthorModel.objects.create(name="Bench author")
+        genre = models.BookGenreModel.objects.create(title="Bench genre")
+        models.BookModel.objects.bulk_create(
+            models.BookModel(
+                title=f"Book {i}", release_year=2000 + i % 20, books_count=i % 7,
+                description="Описание книги " * 20, author=author, genre=genre
+            )
+            for i in range(books_count)
+        )
+        request = APIRequestFactory().get("/api/v1/books/")
+        response = views.BookViewSet.as_view({"get": "list"})(request)
+        return response.data
+
+    def report(self, books_count, data, repeat):
+        results = {}
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                content = renderer.render(data)
+                timings.append(time.perf_counter() - started)
+            results[type(renderer).__name__] = (statistics.median(timings), content)
+
+        json_time, json_content = results["JSONRenderer"]
+        orjson_time, orjson_content = results["ORJSONRenderer"]
+        started = time.perf_counter()
+        ORJSONParser().parse(io.BytesIO(orjson_content))
+        parse_time = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{books_count} books, {len(json_content)} bytes: "
+            f"JSONRenderer {json_time * 1000:.2f} ms, "
+            f"ORJSONRenderer {orjson_time * 1000:.2f} ms "
+            f"(x{json_time / orjson_time:.1f}), "
+            f"ORJSONParser {parse_time * 1000:.2f} ms, "
+            f"identical output: {json_content == orjson_content}"
+        )
+
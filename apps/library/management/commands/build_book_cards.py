@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.library import book_cards
+
+
+class Command(BaseCommand):
+    help = "Пересобирает готовые карточки всех книг, из которых собирается список для анонимов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = book_cards.rebuild_all(options["batch_size"])
+        self.stdout.write(f"Rebuilt {count} book cards")
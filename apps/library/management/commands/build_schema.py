@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Собирает схему OpenAPI в статику для отдачи через nginx."
+
+    def handle(self, *args, **options):
+        if not settings.API_DOCS_ENABLED:
+            self.stdout.write("API docs are disabled, schema is not built")
+            return
+
+        from django_librest import schema
+
+        name = schema.write_schema(schema.generate_schema())
+        self.stdout.write(f"Schema written to {name}")
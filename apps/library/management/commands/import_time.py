@@ -0,0 +1,65 @@
+import collections
+import os
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+_IMPORT_TIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Код, который выполняет воркер uWSGI при старте: настройка Django, WSGI-приложение, URLconf
+STARTUP_CODE = """
+import time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(f"startup {(time.perf_counter() - started) * 1000:.1f}")
+"""
+
+
+class Command(BaseCommand):
+    help = "Показывает самые дорогие импорты при старте воркера (python -X importtime)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=25)
+        parser.add_argument("--sort", choices=("cumulative", "self"), default="cumulative")
+        parser.add_argument("--packages", action="store_true",
+                            help="Суммировать собственное время по пакетам верхнего уровня.")
+
+    def handle(self, *args, **options):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+            env=os.environ.copy(), capture_output=True, text=True
+        )
+        if process.returncode:
+            raise CommandError(process.stderr)
+
+        imports = []
+        for line in process.stderr.splitlines():
+            match = _IMPORT_TIME_RE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                imports.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+        total_ms = sum(self_us for _, self_us, _, _ in imports) / 1000
+        self.stdout.write(f"{process.stdout.strip()} ms, imports {total_ms:.1f} ms, "
+                          f"{len(imports)} modules")
+
+        if options["packages"]:
+            packages = collections.Counter()
+            for name, self_us, _, _ in imports:
+                packages[name.split(".")[0]] += self_us
+            self.stdout.write(f"{'self ms':>10}  package")
+            for package, self_us in packages.most_common(options["limit"]):
+                self.stdout.write(f"{self_us / 1000:>10.1f}  {package}")
+            return
+
+        column = 1 if options["sort"] == "self" else 2
+        imports.sort(key=lambda row: row[column], reverse=True)
+        self.stdout.write(f"{'cumul ms':>10} {'self ms':>8}  module")
+        for name, self_us, cumulative_us, level in imports[:options["limit"]]:
+            self.stdout.write(f"{cumulative_us / 1000:>10.1f} {self_us / 1000:>8.1f}  {name}")
@@ -0,0 +1,13 @@
+from apps.library import outbox
+from apps.library.workers import QueueWorkerCommand
+
+
+class Command(QueueWorkerCommand):
+    help = "Обрабатывает события исходящей очереди: кэши, поиск, рекомендации."
+    item_name = "events"
+
+    def process_batch(self, batch_size, max_attempts):
+        return outbox.process_batch(batch_size, max_attempts)
+
+    def purge(self, older_than):
+        outbox.purge_processed(older_than)
@@ -0,0 +1,97 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+
+
+# Метрики пишутся в общий каталог PROMETHEUS_MULTIPROC_DIR, если он задан,
+# поэтому /metrics отдаёт сумму по всем процессам uWSGI.
+
+REQUEST_LATENCY = Histogram(
+    "librest_http_request_duration_seconds",
+    "Время обработки запроса.",
+    ("view", "method", "status")
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "librest_http_requests_in_progress",
+    "Запросы, обрабатываемые прямо сейчас.",
+    multiprocess_mode="livesum"
+)
+DB_QUERIES = Counter(
+    "librest_db_queries_total",
+    "Количество SQL-запросов.",
+    ("view",)
+)
+DB_QUERY_DURATION = Counter(
+    "librest_db_query_duration_seconds_total",
+    "Время выполнения SQL-запросов.",
+    ("view",)
+)
+SERIALIZER_LATENCY = Histogram(
+    "librest_serializer_duration_seconds",
+    "Время сериализации ответа.",
+    ("view",)
+)
+CACHE_REQUESTS = Counter(
+    "librest_cache_requests_total",
+    "Обращения к кэшу.",
+    ("cache", "result")
+)
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "librest_single_flight_requests_total",
+    "Обращения к кэшу с единственным пересчётом: hit, computed, "
+    "stale и waited (пересчёт схлопнут), timeout (не дождались пересчёта).",
+    ("cache", "result")
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+def get_view_name(request) -> str:
+    """Возвращает имя маршрута запроса, например `book-list`."""
+    resolver_match = getattr(request, "resolver_match", None)
+    return getattr(resolver_match, "url_name", None) or "unknown"
+
+
+def observe_request(request, status_code: int, duration: float, query_counter=None):
+    view = get_view_name(request)
+    REQUEST_LATENCY.labels(view, request.method, f"{status_code // 100}xx").observe(duration)
+    if query_counter is not None:
+        DB_QUERIES.labels(view).inc(query_counter.count)
+        DB_QUERY_DURATION.labels(view).inc(query_counter.duration)
+
+
+@contextmanager
+def time_serializer(request):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SERIALIZER_LATENCY.labels(get_view_name(request)).observe(time.perf_counter() - started)
+
+
+def observe_cache(cache_name: str, hit: bool, count: int = 1):
+    CACHE_REQUESTS.labels(cache_name, "hit" if hit else "miss").inc(count)
+
+
+def observe_single_flight(cache_name: str, result: str, count: int = 1):
+    SINGLE_FLIGHT_REQUESTS.labels(cache_name, result).inc(count)
+
+
+def generate_metrics() -> bytes:
+    """Выгружает метрики в текстовом формате Prometheus."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead():
+    """Убирает метрики живых процессов завершившегося воркера."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
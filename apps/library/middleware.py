@@ -0,0 +1,127 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from apps.library import metrics, profiling
+from apps.library.queries import QueryBudgetExceeded, QueryCounter, endpoint_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_query_budget(view_func, method: str):
+    """Возвращает бюджет запросов, объявленный на вьюшке атрибутом `query_budget`.
+
+    Бюджет задаётся числом или словарём по действиям ViewSet: `{"list": 2}`.
+    """
+    view_class = getattr(view_func, "cls", None)
+    budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        actions = getattr(view_func, "actions", None) or dict()
+        return budget.get(actions.get(method.lower()))
+    return budget
+
+
+class MetricsMiddleware:
+    """Собирает метрики Prometheus: время ответа по маршрутам, запросы в обработке и SQL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_PROGRESS.dec()
+        metrics.observe_request(
+            request, response.status_code, time.perf_counter() - started,
+            getattr(request, "query_counter", None)
+        )
+        return response
+
+
+class ProfilerMiddleware:
+    """Сэмплирующий профайлер запросов с заголовком `X-Profile: 1` от админа или медленных.
+
+    Выключенный (`PROFILER_ENABLED = False`) удаляет себя из цепочки middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        forced = request.META.get("HTTP_X_PROFILE") == "1"
+        threshold = settings.PROFILER_SLOW_REQUEST_THRESHOLD
+        sampler = profiling.get_sampler()
+        active_request = sampler.register(forced, threshold)
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.unregister()
+        duration = time.perf_counter() - active_request.started
+
+        # Пользователь из токена известен только после вьюшки DRF.
+        forced = forced and getattr(getattr(request, "user", None), "is_staff", False)
+        if not forced and (threshold is None or duration < threshold):
+            return response
+
+        query_counter = getattr(request, "query_counter", None)
+        name = profiling.save_profile({
+            "view": metrics.get_view_name(request),
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "forced": forced,
+            "interval_ms": settings.PROFILER_INTERVAL * 1000,
+            "samples": dict(active_request.samples),
+            "sql": query_counter.timeline if query_counter is not None else [],
+        })
+        if forced:
+            response["X-Profile-Id"] = name
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы и время в базе на запрос, ищет N+1 и следит за бюджетом вьюшки.
+
+    При превышении бюджета пишет в лог, а с `QUERY_BUDGET_RAISE = True` бросает исключение.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        with QueryCounter(timeline=settings.PROFILER_ENABLED) as counter:
+            response = self.get_response(request)
+        request.query_counter = counter
+
+        resolver_match = getattr(request, "resolver_match", None)
+        endpoint = getattr(resolver_match, "url_name", None) or "unknown"
+        budget = request.query_budget
+        over_budget = budget is not None and counter.count > budget
+        endpoint_stats.add(endpoint, counter, over_budget)
+
+        if counter.get_duplicates():
+            logger.warning("%s %s: %s", request.method, endpoint, counter.get_report())
+        if over_budget:
+            message = f"{request.method} {endpoint}: budget of {budget} queries exceeded, " \
+                      f"{counter.get_report()}"
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.error(message)
+
+        if settings.DEBUG:
+            response["Server-Timing"] = \
+                f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries"'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
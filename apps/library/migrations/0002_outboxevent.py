@@ -0,0 +1,37 @@
+# Generated by Django 3.1.4 on 2026-10-19 13:46
+
+import apps.library.models
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEventModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100, verbose_name='Тема')),
+                ('payload', models.JSONField(default=dict, verbose_name='Данные')),
+                ('key', models.CharField(default=apps.library.models.generate_outbox_key, max_length=255, unique=True, verbose_name='Ключ идемпотентности')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Доступно для обработки')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Обработано')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Событие исходящей очереди',
+                'verbose_name_plural': 'События исходящей очереди',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxeventmodel',
+            index=models.Index(condition=models.Q(processed_at__isnull=True), fields=['available_at'], name='outbox_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.4 on 2026-10-19 13:50
+
+from django.db import migrations, models
+
+
+def delete_duplicate_ratings(apps, schema_editor):
+    """Оставляет по одному, самому новому рейтингу на пару книга-юзер."""
+    BookRatingModel = apps.get_model('library', 'BookRatingModel')
+    duplicates = BookRatingModel.objects \
+        .values('book', 'user') \
+        .annotate(last_id=models.Max('id'), count=models.Count('id')) \
+        .filter(count__gt=1)
+    for duplicate in duplicates:
+        BookRatingModel.objects \
+            .filter(book=duplicate['book'], user=duplicate['user']) \
+            .exclude(id=duplicate['last_id']) \
+            .delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_outboxevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bookratingmodel',
+            constraint=models.UniqueConstraint(fields=('book', 'user'), name='unique_book_rating_per_user'),
+        ),
+    ]
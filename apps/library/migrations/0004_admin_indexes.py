@@ -0,0 +1,43 @@
+# Generated by Django 3.1.4 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+# Admin search uses istartswith (`UPPER(col::text) LIKE UPPER('x%')`), which needs expression indexes
+SEARCH_INDEXES = (
+    ('library_book_title_upper_idx', 'library_bookmodel', 'title'),
+    ('library_author_name_upper_idx', 'library_bookauthormodel', 'name'),
+    ('library_genre_title_upper_idx', 'library_bookgenremodel', 'title'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" (UPPER("{column}"::text) text_pattern_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_unique_book_rating'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookmodel',
+            name='release_year',
+            field=models.PositiveSmallIntegerField(db_index=True, verbose_name='Год выхода'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.1.4 on 2026-10-19 14:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def backfill_changes(apps, schema_editor):
+    """Записывает в ленту текущий каталог, чтобы первая синхронизация с since=0 была полной."""
+    CatalogChangeModel = apps.get_model('library', 'CatalogChangeModel')
+    for kind, model_name in (('author', 'BookAuthorModel'), ('genre', 'BookGenreModel'), ('book', 'BookModel')):
+        model = apps.get_model('library', model_name)
+        object_ids = model.objects.order_by('pk').values_list('pk', flat=True).iterator()
+        CatalogChangeModel.objects.bulk_create(
+            (CatalogChangeModel(kind=kind, object_id=object_id) for object_id in object_ids),
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChangeModel',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False, verbose_name='Номер изменения')),
+                ('kind', models.CharField(choices=[('book', 'Книга'), ('author', 'Автор'), ('genre', 'Жанр')], max_length=10, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Удалён')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Изменён')),
+            ],
+            options={
+                'verbose_name': 'Изменение каталога',
+                'verbose_name_plural': 'Изменения каталога',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='catalogchangemodel',
+            index=models.Index(fields=['kind', 'object_id'], name='catalog_change_object_idx'),
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
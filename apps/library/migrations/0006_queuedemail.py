@@ -0,0 +1,34 @@
+# Generated by Django 3.1.4 on 2026-10-19 14:19
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_catalogchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmailModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.JSONField(verbose_name='Письмо')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Доступно для отправки')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Отправлено')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Письмо в очереди',
+                'verbose_name_plural': 'Письма в очереди',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='queuedemailmodel',
+            index=models.Index(condition=models.Q(sent_at__isnull=True), fields=['available_at'], name='queued_email_pending_idx'),
+        ),
+    ]
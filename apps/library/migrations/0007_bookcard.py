@@ -0,0 +1,26 @@
+# Generated by Django 3.1.4 on 2026-10-19 14:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_queuedemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookCardModel',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='library.bookmodel', verbose_name='Книга')),
+                ('data', models.TextField(verbose_name='JSON')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Карточка книги',
+                'verbose_name_plural': 'Карточки книг',
+            },
+        ),
+    ]
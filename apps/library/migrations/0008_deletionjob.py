@@ -0,0 +1,41 @@
+# Generated by Django 3.1.4 on 2026-10-19 14:32
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_bookcard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJobModel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Ключ для проверки статуса')),
+                ('kind', models.CharField(choices=[('book', 'Книга'), ('user', 'Пользователь')], max_length=10, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('status', models.CharField(choices=[('pending', 'В процессе'), ('done', 'Завершено')], default='pending', max_length=10, verbose_name='Статус')),
+                ('reviews_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено отзывов')),
+                ('ratings_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено рейтингов')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Фоновое удаление',
+                'verbose_name_plural': 'Фоновые удаления',
+            },
+        ),
+        migrations.AddField(
+            model_name='bookmodel',
+            name='hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыта'),
+        ),
+        migrations.AddConstraint(
+            model_name='deletionjobmodel',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_deletion_job_object'),
+        ),
+    ]
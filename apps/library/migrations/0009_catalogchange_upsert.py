@@ -0,0 +1,41 @@
+# Generated by Django 3.1.4 on 2026-10-19 14:44
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    """Оставляет по одной, последней записи на объект перед уникальным ограничением."""
+    CatalogChangeModel = apps.get_model('library', 'CatalogChangeModel')
+    latest = CatalogChangeModel.objects \
+        .values('kind', 'object_id') \
+        .annotate(latest_seq=models.Max('seq')) \
+        .values('latest_seq')
+    CatalogChangeModel.objects.exclude(seq__in=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_deletionjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='catalogchangemodel',
+            name='catalog_change_object_idx',
+        ),
+        migrations.AddField(
+            model_name='catalogchangemodel',
+            name='txid',
+            field=models.BigIntegerField(default=0, verbose_name='Транзакция'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogchangemodel',
+            index=models.Index(fields=['txid', 'seq'], name='catalog_change_order_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='catalogchangemodel',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_catalog_change_object'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.1.4 on 2026-10-19 18:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_catalogchange_upsert'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        # Таблицу уже забрало приложение users
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(
+                    name='QueuedEmailModel',
+                ),
+            ],
+        ),
+    ]
@@ -1,14 +1,320 @@
-from rest_framework import serializers
+import hashlib
+import json
+import operator
 
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
 
-class BookReviewRatingMixin(serializers.ModelSerializer):
+from rest_framework import renderers, serializers, status
+from rest_framework.response import Response
+
+from apps.library import book_cache, loaders, metrics, models as library_models, user_ratings
+
+
+def load_usernames(user_ids) -> dict:
+    return dict(library_models.UserModel.objects.filter(pk__in=user_ids).values_list("pk", "username"))
+
+
+def load_book_titles(book_ids) -> dict:
+    return dict(library_models.BookModel.objects.filter(pk__in=book_ids).values_list("pk", "title"))
+
+
+class BookReviewRatingMixin(loaders.BatchLoadMixin, serializers.ModelSerializer):
     """Миксин для дополнения сериализации отзыва и рейтинга книги."""
     book_title = serializers.ReadOnlyField()
+    book = serializers.PrimaryKeyRelatedField(queryset=library_models.BookModel.objects.visible())
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    batch_loads = {
+        "user": ("user_id", load_usernames),
+        "book_title": ("book_id", load_book_titles),
+    }
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data["user"] = instance.user.username
-        data["book_title"] = instance.book.title
+        data["user"] = self.load("user", instance)
+        data["book_title"] = self.load("book_title", instance)
         data.pop("book")
         return data
+
+
+class ReadSerializerMixin:
+    """Миксин вьюшки, отдающий list/retrieve через быстрый сериализатор только для чтения.
+
+    Браузерный API остаётся на обычном сериализаторе, т.к. строит по нему формы.
+    """
+    read_serializer_class = None
+    read_actions = ("list", "retrieve")
+
+    def use_read_serializer(self) -> bool:
+        renderer = getattr(self.request, "accepted_renderer", None)
+        return self.read_serializer_class is not None \
+            and self.action in self.read_actions \
+            and not isinstance(renderer, renderers.BrowsableAPIRenderer)
+
+    def get_serializer_class(self):
+        if self.use_read_serializer():
+            return self.read_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.use_read_serializer():
+            return self.read_serializer_class.prepare_queryset(queryset, self.request)
+        return queryset
+
+
+def get_query_param_list(request, name) -> list:
+    """Возвращает значения параметра запроса вида `?name=a,b`."""
+    if request is None:
+        return []
+    value = request.query_params.get(name, "")
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class SparseFieldsMixin:
+    """Миксин быстрого сериализатора с параметрами `?fields=` и `?expand=`.
+
+    `id` отдаётся всегда, неизвестные поля игнорируются.
+    Поле `<name>` выводится методом `represent_<name>`, если он есть.
+    """
+    sparse_fields = ()
+    nested_fields = dict()
+    expandable_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_fields, self.requested_nested_fields, self.expanded_fields = \
+            self.get_requested_fields(self.context.get("request"))
+        self.representers = tuple(
+            (name, getattr(self, f"represent_{name}", None) or self.get_field_getter(name))
+            for name in self.requested_fields
+        )
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        """Возвращает запрошенные поля, вложенные поля и раскрываемые связи."""
+        fields = set(get_query_param_list(request, "fields"))
+        expanded_fields = set(get_query_param_list(request, "expand")) \
+            .intersection(cls.expandable_fields)
+        if not fields:
+            return cls.sparse_fields, cls.nested_fields, expanded_fields
+
+        requested_fields = tuple(
+            name for name in cls.sparse_fields
+            if name == "id" or name in fields or any(
+                f"{name}.{nested_name}" in fields
+                for nested_name in cls.nested_fields.get(name, ())
+            )
+        )
+        requested_nested_fields = {
+            name: tuple(
+                nested_name for nested_name in nested_names
+                if name in fields or f"{name}.{nested_name}" in fields
+            )
+            for name, nested_names in cls.nested_fields.items()
+        }
+        return requested_fields, requested_nested_fields, expanded_fields
+
+    def get_field_getter(self, name):
+        return operator.itemgetter(name)
+
+    def to_representation(self, instance):
+        return {name: represent(instance) for name, represent in self.representers}
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """Список, замеряющий время сериализации без учёта выборки из базы."""
+
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, models.Manager) else data)
+        with metrics.time_serializer(self.context.get("request")):
+            return [self.child.to_representation(item) for item in iterable]
+
+
+class TimedSerializerMixin:
+    """Миксин сериализатора, отдающий время сериализации в метрики."""
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with metrics.time_serializer(self.context.get("request")):
+            return super().data
+
+
+class ThrottleHeadersMixin:
+    """Миксин вьюшки, добавляющий в ответ лимит и остаток квоты записи."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        for header, value in getattr(request, "throttle_headers", dict()).items():
+            response[header] = value
+        return response
+
+
+class CacheControlMixin:
+    """Миксин вьюшки каталога: разрешает общим кэшам (микрокэшу nginx) хранить ответы анонимам.
+
+    Ответы юзерам зависят от их оценок и помечаются как `private`.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ("GET", "HEAD") or response.status_code != 200:
+            return response
+        patch_vary_headers(response, ("Accept", "Authorization", "Cookie"))
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=settings.CATALOG_CACHE_MAX_AGE,
+                stale_while_revalidate=settings.CATALOG_CACHE_STALE_WHILE_REVALIDATE
+            )
+        return response
+
+
+class BookCacheMixin:
+    """Миксин вьюшки книг: list/retrieve быстрого сериализатора берутся из `BOOK_CACHE_ALIAS`.
+
+    Промах пересчитывает один процесс, остальные получают устаревший ответ или ждут его.
+    В кэше лежит общий для всех ответ, оценка юзера `your_rating` добавляется после.
+    """
+
+    def use_book_cache(self) -> bool:
+        return book_cache.get_cache() is not None and self.use_read_serializer()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.use_book_cache():
+            context["user_ratings"] = dict()
+        return context
+
+    def add_user_ratings(self, items):
+        _, nested_fields, _ = self.read_serializer_class.get_requested_fields(self.request)
+        if "your_rating" not in nested_fields.get("additional_info", ()):
+            return
+        ratings = user_ratings.get_user_ratings(self.request.user)
+        for item in items:
+            rating = ratings.get(item["id"])
+            if rating is not None and "additional_info" in item:
+                item["additional_info"]["your_rating"] = rating
+
+    def get_many_data(self, book_ids) -> dict:
+        """Данные книг `{id: data}` одним запросом, с кэшем — через записи карточек книг."""
+        serializer_class = self.read_serializer_class
+        context = self.get_serializer_context()
+        use_book_cache = book_cache.get_cache() is not None
+        if use_book_cache:
+            context["user_ratings"] = dict()
+
+        def compute(ids):
+            queryset = serializer_class.prepare_queryset(
+                self.queryset.filter(pk__in=ids), self.request
+            )
+            return {item["id"]: item for item in serializer_class(queryset, many=True, context=context).data}
+
+        if not use_book_cache:
+            return compute(book_ids)
+        data = book_cache.get_many_details(book_ids, self.request, compute)
+        self.add_user_ratings(data.values())
+        return data
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_book_cache():
+            return super().list(request, *args, **kwargs)
+        compute_list = super().list
+        data = book_cache.get_list(request, lambda: compute_list(request, *args, **kwargs).data)
+        self.add_user_ratings(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_book_cache():
+            return super().retrieve(request, *args, **kwargs)
+        compute_detail = super().retrieve
+        data = book_cache.get_detail(
+            self.kwargs[self.lookup_field], request,
+            lambda: compute_detail(request, *args, **kwargs).data
+        )
+        self.add_user_ratings([data])
+        return Response(data)
+
+
+class AtomicWriteMixin:
+    """Миксин вьюшки, выполняющий запись в транзакции вместе с событиями исходящей очереди."""
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+
+
+class IdempotencyKeyMixin:
+    """Миксин вьюшки: повтор POST с тем же заголовком `Idempotency-Key` возвращает сохранённый ответ.
+
+    Ключи хранятся `IDEMPOTENCY_KEY_TTL` секунд отдельно для каждого юзера вместе с хэшем тела.
+    Пока первый запрос с ключом не завершился, повторы получают 409,
+    повтор ключа с другим телом — 422.
+    """
+
+    def get_idempotency_cache_key(self, request):
+        key = request.META.get("HTTP_IDEMPOTENCY_KEY")
+        if not key or not request.user.is_authenticated:
+            return None
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f"idempotency:{type(self).__name__}:{request.user.pk}:{digest}"
+
+    @staticmethod
+    def get_body_digest(request) -> str:
+        body = json.dumps(request.data, sort_keys=True, default=str)
+        return hashlib.sha256(body.encode()).hexdigest()
+
+    def run_idempotent(self, handler, request, *args, **kwargs):
+        """Выполняет `handler` один раз на ключ идемпотентности запроса."""
+        cache_key = self.get_idempotency_cache_key(request)
+        if cache_key is None:
+            return handler(request, *args, **kwargs)
+
+        cache = caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+        body_digest = self.get_body_digest(request)
+        added = cache.add(cache_key, {"body": body_digest}, settings.IDEMPOTENCY_KEY_TTL)
+        metrics.observe_cache("idempotency", not added)
+        if not added:
+            stored = cache.get(cache_key)
+            if stored is not None and stored["body"] != body_digest:
+                return Response(
+                    {"detail": "Idempotency-Key уже использован с другим телом запроса."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if stored is None or "data" not in stored:
+                return Response(
+                    {"detail": "Запрос с этим Idempotency-Key ещё выполняется."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            response = Response(stored["data"], status=stored["status"])
+            response["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            response = handler(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        if status.is_success(response.status_code):
+            cache.set(cache_key, {"body": body_digest, "data": response.data, "status": response.status_code},
+                      settings.IDEMPOTENCY_KEY_TTL)
+        else:
+            cache.delete(cache_key)
+        return response
+
+    def create(self, request, *args, **kwargs):
+        return self.run_idempotent(super().create, request, *args, **kwargs)
@@ -1,10 +1,20 @@
+import collections
+import uuid
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Avg, Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
 
 
 UserModel = get_user_model()
 
+# Отправляется после `BookRatingModel.objects.upsert` с аргументами `user_id` и `results`
+ratings_upserted = Signal()
+
 
 class BookAuthorModel(models.Model):
     """Модель автора книги."""
@@ -30,10 +40,53 @@ class BookGenreModel(models.Model):
         verbose_name_plural = "Жанры"
 
 
+class BookQuerySet(models.QuerySet):
+    """Запросы книг."""
+
+    additional_info_fields = ("reviews_count", "common_rating", "your_rating")
+
+    def visible(self):
+        """Книги без скрытых: те ждут фонового удаления."""
+        return self.filter(hidden=False)
+
+    def with_additional_info(self, user, fields=additional_info_fields):
+        """Аннотирует книги количеством отзывов, общим рейтингом и оценкой пользователя.
+
+        `fields` ограничивает набор аннотаций.
+        """
+        reviews = BookReviewModel.objects \
+            .filter(book=OuterRef("pk")) \
+            .order_by() \
+            .values("book")
+        ratings = BookRatingModel.objects \
+            .filter(book=OuterRef("pk")) \
+            .order_by()
+
+        annotations = dict()
+        if "reviews_count" in fields:
+            annotations["reviews_count"] = Coalesce(
+                Subquery(reviews.annotate(count=Count("pk")).values("count")), 0
+            )
+        if "common_rating" in fields:
+            annotations["common_rating"] = Subquery(
+                ratings.values("book").annotate(rating=Avg("rating")).values("rating")
+            )
+        if "your_rating" in fields:
+            if user.is_authenticated:
+                annotations["your_rating"] = Subquery(
+                    ratings.filter(user=user).values("rating")[:1]
+                )
+            else:
+                annotations["your_rating"] = Value(
+                    None, output_field=models.PositiveSmallIntegerField()
+                )
+        return self.annotate(**annotations)
+
+
 class BookModel(models.Model):
     """Модель книги."""
     title = models.CharField("Название", max_length=255)
-    release_year = models.PositiveSmallIntegerField("Год выхода")
+    release_year = models.PositiveSmallIntegerField("Год выхода", db_index=True)
     books_count = models.PositiveIntegerField("Количество книг", default=0)
     description = models.TextField("Описание")
     author = models.ForeignKey(
@@ -48,6 +101,9 @@ class BookModel(models.Model):
         on_delete=models.PROTECT,
         related_name="books"
     )
+    hidden = models.BooleanField("Скрыта", default=False)
+
+    objects = BookQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -57,6 +113,26 @@ class BookModel(models.Model):
         verbose_name_plural = "Книги"
 
 
+class BookCardModel(models.Model):
+    """Модель готового JSON книги в представлении по умолчанию, из которого собирается список."""
+    book = models.OneToOneField(
+        BookModel,
+        verbose_name="Книга",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="card"
+    )
+    data = models.TextField("JSON")
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    def __str__(self):
+        return str(self.book_id)
+
+    class Meta:
+        verbose_name = "Карточка книги"
+        verbose_name_plural = "Карточки книг"
+
+
 class BookReviewModel(models.Model):
     """Модель отзыва книги."""
     review = models.TextField("Отзыв")
@@ -74,13 +150,70 @@ class BookReviewModel(models.Model):
     )
 
     def __str__(self):
-        return f"{self.pk}: {self.book.pk}"
+        return f"{self.pk}: {self.book_id}"
 
     class Meta:
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
 
 
+class RatingUpsertResult(collections.namedtuple(
+    "RatingUpsertResult", ("id", "book_id", "rating", "old_rating", "created")
+)):
+    """Результат записи рейтинга: `old_rating` — значение до записи, None для нового."""
+
+    @property
+    def changed(self) -> bool:
+        return self.created or self.rating != self.old_rating
+
+
+class BookRatingQuerySet(models.QuerySet):
+    """Менеджер и кверисет рейтингов книг."""
+
+    def upsert(self, user_id: int, ratings: dict) -> list:
+        """Записывает рейтинги юзера `{book_id: rating}` одним `INSERT ... ON CONFLICT`.
+
+        На PostgreSQL прежние значения читаются в том же запросе из снимка CTE,
+        на остальных базах — отдельным запросом в той же транзакции.
+        """
+        if not ratings:
+            return []
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        book_ids = list(ratings)
+        values = ", ".join(["(%s, %s, %s)"] * len(ratings))
+        params = [param for book_id, rating in ratings.items() for param in (book_id, user_id, rating)]
+        sql = (
+            f"INSERT INTO {table} (book_id, user_id, rating) VALUES {values} "
+            f"ON CONFLICT (book_id, user_id) DO UPDATE SET rating = EXCLUDED.rating "
+        )
+
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                placeholders = ", ".join(["%s"] * len(book_ids))
+                cursor.execute(
+                    f"WITH old AS (SELECT book_id, rating FROM {table} "
+                    f"WHERE user_id = %s AND book_id IN ({placeholders})) "
+                    f"{sql}RETURNING id, book_id, rating, "
+                    f"(SELECT old.rating FROM old WHERE old.book_id = {table}.book_id), "
+                    f"{table}.xmax = 0",
+                    [user_id, *book_ids, *params]
+                )
+                results = [RatingUpsertResult(*row) for row in cursor.fetchall()]
+            else:
+                old_ratings = dict(
+                    self.filter(user_id=user_id, book_id__in=book_ids).values_list("book_id", "rating")
+                )
+                cursor.execute(f"{sql}RETURNING id, book_id, rating", params)
+                results = [
+                    RatingUpsertResult(pk, book_id, rating, old_ratings.get(book_id),
+                                       book_id not in old_ratings)
+                    for pk, book_id, rating in cursor.fetchall()
+                ]
+            ratings_upserted.send(sender=self.model, user_id=user_id, results=results)
+        return results
+
+
 class BookRatingModel(models.Model):
     """Модель рейтинга книги."""
     rating = models.PositiveSmallIntegerField(
@@ -103,9 +236,124 @@ class BookRatingModel(models.Model):
         related_name="book_ratings"
     )
 
+    objects = BookRatingQuerySet.as_manager()
+
     def __str__(self):
-        return f"{self.rating}: {self.book.pk}"
+        return f"{self.rating}: {self.book_id}"
 
     class Meta:
         verbose_name = "Рейтинг"
         verbose_name_plural = "Рейтинги"
+        constraints = [
+            models.UniqueConstraint(fields=["book", "user"], name="unique_book_rating_per_user"),
+        ]
+
+
+def generate_outbox_key():
+    return uuid.uuid4().hex
+
+
+class OutboxEventModel(models.Model):
+    """Модель события исходящей очереди, записанного в одной транзакции с изменением."""
+    topic = models.CharField("Тема", max_length=100)
+    payload = models.JSONField("Данные", default=dict)
+    key = models.CharField(
+        "Ключ идемпотентности", max_length=255, unique=True, default=generate_outbox_key
+    )
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    available_at = models.DateTimeField("Доступно для обработки", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField("Попытки", default=0)
+    processed_at = models.DateTimeField("Обработано", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+
+    def __str__(self):
+        return f"{self.pk}: {self.topic}"
+
+    class Meta:
+        verbose_name = "Событие исходящей очереди"
+        verbose_name_plural = "События исходящей очереди"
+        indexes = [
+            models.Index(
+                fields=["available_at"],
+                condition=Q(processed_at__isnull=True),
+                name="outbox_pending_idx"
+            ),
+        ]
+
+
+class DeletionJobModel(models.Model):
+    """Модель фонового удаления книги или юзера: сначала пачками удаляются
+    их отзывы и рейтинги, потом сам объект.
+    """
+    KIND_BOOK = "book"
+    KIND_USER = "user"
+    KIND_CHOICES = (
+        (KIND_BOOK, "Книга"),
+        (KIND_USER, "Пользователь"),
+    )
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "В процессе"),
+        (STATUS_DONE, "Завершено"),
+    )
+
+    key = models.UUIDField("Ключ для проверки статуса", default=uuid.uuid4, unique=True, editable=False)
+    kind = models.CharField("Тип объекта", max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField("ID объекта")
+    status = models.CharField("Статус", max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    reviews_deleted = models.PositiveIntegerField("Удалено отзывов", default=0)
+    ratings_deleted = models.PositiveIntegerField("Удалено рейтингов", default=0)
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    finished_at = models.DateTimeField("Завершено", null=True, blank=True)
+
+    def get_dependent_filters(self) -> dict:
+        """Фильтр отзывов и рейтингов удаляемого объекта."""
+        field = "book_id" if self.kind == self.KIND_BOOK else "user_id"
+        return {field: self.object_id}
+
+    def __str__(self):
+        return f"{self.pk}: {self.kind} {self.object_id}"
+
+    class Meta:
+        verbose_name = "Фоновое удаление"
+        verbose_name_plural = "Фоновые удаления"
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_deletion_job_object"),
+        ]
+
+
+class CatalogChangeModel(models.Model):
+    """Модель записи ленты изменений каталога: последнее изменение объекта с номером `seq`.
+
+    На объект хранится одна запись, удалённые объекты остаются надгробиями.
+    `txid` — транзакция PostgreSQL, записавшая изменение (на остальных базах 0).
+    """
+    KIND_BOOK = "book"
+    KIND_AUTHOR = "author"
+    KIND_GENRE = "genre"
+    KIND_CHOICES = (
+        (KIND_BOOK, "Книга"),
+        (KIND_AUTHOR, "Автор"),
+        (KIND_GENRE, "Жанр"),
+    )
+
+    seq = models.BigAutoField("Номер изменения", primary_key=True)
+    kind = models.CharField("Тип объекта", max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField("ID объекта")
+    deleted = models.BooleanField("Удалён", default=False)
+    changed_at = models.DateTimeField("Изменён", default=timezone.now)
+    txid = models.BigIntegerField("Транзакция", default=0)
+
+    def __str__(self):
+        return f"{self.seq}: {self.kind} {self.object_id}"
+
+    class Meta:
+        verbose_name = "Изменение каталога"
+        verbose_name_plural = "Изменения каталога"
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_catalog_change_object"),
+        ]
+        indexes = [
+            models.Index(fields=["txid", "seq"], name="catalog_change_order_idx"),
+        ]
@@ -0,0 +1,95 @@
+import collections
+import datetime
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.library import models
+
+
+logger = logging.getLogger(__name__)
+
+_handlers = collections.defaultdict(list)
+
+
+def enqueue(topic: str, payload: dict, key: str = None):
+    """Добавляет событие в исходящую очередь в текущей транзакции.
+
+    Повторное событие с тем же `key` игнорируется.
+    """
+    event = models.OutboxEventModel(topic=topic, payload=payload)
+    if key is not None:
+        event.key = key
+    models.OutboxEventModel.objects.bulk_create([event], ignore_conflicts=True)
+
+
+def enqueue_many(topic: str, payloads: list):
+    """Добавляет пачку событий одной темы одним запросом."""
+    models.OutboxEventModel.objects.bulk_create(
+        [models.OutboxEventModel(topic=topic, payload=payload) for payload in payloads]
+    )
+
+
+def handler(*topics):
+    """Регистрирует обработчик событий тем: `handler(events)` получает пачку событий одной темы.
+
+    Доставка «как минимум один раз», поэтому обработчик должен быть идемпотентным,
+    например по `event.key`.
+    """
+    def decorator(func):
+        for topic in topics:
+            _handlers[topic].append(func)
+        return func
+    return decorator
+
+
+def get_retry_delay(attempts: int) -> datetime.timedelta:
+    """Экспоненциальная задержка перед повтором: 2, 4, 8... секунд, не больше часа."""
+    return datetime.timedelta(seconds=min(2 ** attempts, 3600))
+
+
+def process_batch(batch_size=100, max_attempts=10) -> int:
+    """Обрабатывает пачку готовых событий и возвращает их количество.
+
+    Несколько воркеров не мешают друг другу: строки берутся с `SKIP LOCKED`.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            models.OutboxEventModel.objects
+            .select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, available_at__lte=now, attempts__lt=max_attempts)
+            .order_by("id")[:batch_size]
+        )
+        events_by_topic = collections.defaultdict(list)
+        for event in events:
+            events_by_topic[event.topic].append(event)
+
+        for topic, topic_events in events_by_topic.items():
+            try:
+                with transaction.atomic():
+                    for topic_handler in _handlers.get(topic, ()):
+                        topic_handler(topic_events)
+            except Exception as exc:
+                logger.exception("Outbox handler failed for %s", topic)
+                for event in topic_events:
+                    event.attempts += 1
+                    event.last_error = repr(exc)
+                    event.available_at = now + get_retry_delay(event.attempts)
+            else:
+                for event in topic_events:
+                    event.processed_at = now
+
+        models.OutboxEventModel.objects.bulk_update(
+            events, ["attempts", "last_error", "available_at", "processed_at"]
+        )
+    return len(events)
+
+
+def purge_processed(older_than: datetime.timedelta) -> int:
+    """Удаляет обработанные события старше `older_than`."""
+    deleted, _ = models.OutboxEventModel.objects \
+        .filter(processed_at__lt=timezone.now() - older_than) \
+        .delete()
+    return deleted
@@ -15,7 +15,7 @@ class IsOwner(permissions.BasePermission):
     """Владелец может делать всё."""
 
     def has_object_permission(self, request, view, obj) -> bool:
-        return request.user == obj.user
+        return obj.user_id == request.user.pk
 
     def has_permission(self, request, view) -> bool:
         return request.user.is_authenticated
@@ -0,0 +1,163 @@
+import collections
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+# Имя файла профиля: без точки в начале (временные файлы) и только с суффиксом .json
+_PROFILE_NAME_RE = re.compile(r"^\w[\w.-]*\.json$")
+_PROFILE_FILE_RE = re.compile(r"^(?P<created>\d+\.\d+)-(?P<pid>\d+)-(?P<view>.+)\.json$")
+
+
+class ActiveRequest:
+    """Запрос, стек которого снимает сэмплер."""
+
+    def __init__(self, forced: bool, threshold):
+        self.started = time.perf_counter()
+        self.forced = forced
+        self.threshold = threshold
+        self.samples = collections.Counter()
+
+
+def get_folded_stack(frame) -> str:
+    """Сворачивает стек в строку формата flamegraph: `корень;...;вершина`."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class StackSampler(threading.Thread):
+    """Фоновый поток процесса, снимающий стеки профилируемых и медленных запросов."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.active = dict()
+        self._has_active = threading.Event()
+
+    def register(self, forced: bool, threshold) -> ActiveRequest:
+        """Начинает отслеживать запрос текущего потока.
+
+        Стек снимается сразу, если `forced`, иначе — после `threshold` секунд.
+        """
+        active_request = ActiveRequest(forced, threshold)
+        self.active[threading.get_ident()] = active_request
+        self._has_active.set()
+        return active_request
+
+    def unregister(self):
+        self.active.pop(threading.get_ident(), None)
+
+    def run(self):
+        while True:
+            self._has_active.clear()
+            if not self.active:
+                self._has_active.wait()
+            time.sleep(self.interval)
+            self.sample()
+
+    def sample(self):
+        now = time.perf_counter()
+        frames = None
+        for thread_id, active_request in list(self.active.items()):
+            threshold = active_request.threshold
+            if not active_request.forced and (
+                threshold is None or now - active_request.started < threshold
+            ):
+                continue
+            if frames is None:
+                frames = sys._current_frames()
+            frame = frames.get(thread_id)
+            if frame is not None:
+                active_request.samples[get_folded_stack(frame)] += 1
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+_sampler_pid = None
+
+
+def get_sampler() -> StackSampler:
+    """Возвращает сэмплер текущего процесса, запуская его после fork воркера."""
+    global _sampler, _sampler_pid
+    if _sampler is None or _sampler_pid != os.getpid():
+        with _sampler_lock:
+            if _sampler is None or _sampler_pid != os.getpid():
+                _sampler = StackSampler(settings.PROFILER_INTERVAL)
+                _sampler.start()
+                _sampler_pid = os.getpid()
+    return _sampler
+
+
+def get_profiles_dir() -> Path:
+    return Path(settings.PROFILER_DIR)
+
+
+def save_profile(profile: dict) -> str:
+    """Записывает профиль в кольцевой буфер на диске, удаляя самые старые."""
+    profiles_dir = get_profiles_dir()
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{time.time():.6f}-{os.getpid()}-{profile['view']}.json"
+    temporary_path = profiles_dir / f".{name}"
+    temporary_path.write_text(json.dumps(profile))
+    temporary_path.rename(profiles_dir / name)
+
+    for old_name in list_profiles()[settings.PROFILER_MAX_FILES:]:
+        try:
+            (profiles_dir / old_name).unlink()
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def scan_profiles() -> list:
+    """Возвращает записи каталога сохранённых профилей, новые первыми."""
+    try:
+        with os.scandir(get_profiles_dir()) as entries:
+            profiles = [entry for entry in entries if _PROFILE_NAME_RE.match(entry.name) and entry.is_file()]
+    except FileNotFoundError:
+        return []
+    return sorted(profiles, key=lambda entry: entry.name, reverse=True)
+
+
+def list_profiles() -> list:
+    """Возвращает имена сохранённых профилей, новые первыми."""
+    return [entry.name for entry in scan_profiles()]
+
+
+def get_profile_info(entry) -> dict:
+    """Сведения о профиле из имени и метаданных файла, без чтения самого профиля."""
+    match = _PROFILE_FILE_RE.match(entry.name)
+    stat = entry.stat()
+    created = float(match["created"]) if match else stat.st_mtime
+    return {
+        "name": entry.name,
+        "view": match["view"] if match else None,
+        "created_at": datetime.datetime.fromtimestamp(created, tz=datetime.timezone.utc),
+        "size": stat.st_size,
+    }
+
+
+def load_profile(name: str):
+    """Загружает профиль по имени или возвращает None."""
+    if not _PROFILE_NAME_RE.match(name):
+        return None
+    try:
+        return json.loads((get_profiles_dir() / name).read_text())
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def get_folded_profile(profile: dict) -> str:
+    """Профиль в формате folded stacks для flamegraph.pl и speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["samples"].items())
@@ -0,0 +1,132 @@
+import collections
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос к API выполнил больше SQL-запросов, чем разрешено вьюшке."""
+
+
+_IN_LIST_RE = re.compile(r"\bIN \((?:%s, )*%s\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+
+def get_sql_shape(sql: str) -> str:
+    """Приводит SQL к форме без литералов, чтобы одинаковые запросы совпадали."""
+    return _NUMBER_RE.sub("?", _IN_LIST_RE.sub("IN (...)", sql))
+
+
+class QueryCounter:
+    """Считает SQL-запросы и время в базе, пока активен как контекстный менеджер.
+
+    С `timeline=True` также запоминает первые `TIMELINE_LIMIT` запросов с их временем.
+    Служебные запросы транзакций (BEGIN, SAVEPOINT, RELEASE) считаются наравне с остальными:
+    это такие же обращения к базе.
+    """
+    TIMELINE_LIMIT = 1000
+
+    def __init__(self, timeline=False):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = collections.Counter()
+        self.timeline = [] if timeline else None
+        self.started = None
+        self._exit_stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.duration += duration
+            self.count += 1
+            self.shapes[get_sql_shape(sql)] += 1
+            if self.timeline is not None and len(self.timeline) < self.TIMELINE_LIMIT:
+                self.timeline.append({
+                    "start_ms": round((started - self.started) * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                    "sql": sql,
+                })
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._exit_stack = ExitStack()
+        for connection in connections.all():
+            self._exit_stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._exit_stack.close()
+
+    def get_duplicates(self, threshold=None) -> dict:
+        """Возвращает повторяющиеся формы запросов — кандидатов в N+1."""
+        if threshold is None:
+            threshold = settings.QUERY_BUDGET_DUPLICATES_THRESHOLD
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def get_report(self) -> str:
+        report = f"{self.count} queries, {self.duration * 1000:.1f} ms"
+        for shape, count in self.get_duplicates().items():
+            report += f"\n  N+1 candidate ({count}x): {shape}"
+        return report
+
+
+class assert_query_budget:
+    """Проверяет в тестах, что блок кода уложился в `max_queries` запросов."""
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self.counter = QueryCounter()
+
+    def __enter__(self):
+        return self.counter.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.counter.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.counter.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"Budget of {self.max_queries} queries exceeded: {self.counter.get_report()}"
+            )
+
+
+class EndpointStats:
+    """Накопленная статистика запросов к базе по эндпоинтам текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = dict()
+
+    def add(self, endpoint: str, counter: QueryCounter, over_budget: bool):
+        duplicates = counter.get_duplicates()
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                "requests": 0,
+                "queries": 0,
+                "max_queries": 0,
+                "db_time": 0.0,
+                "over_budget": 0,
+                "n_plus_one": 0,
+            })
+            stats["requests"] += 1
+            stats["queries"] += counter.count
+            stats["max_queries"] = max(stats["max_queries"], counter.count)
+            stats["db_time"] += counter.duration
+            stats["over_budget"] += over_budget
+            stats["n_plus_one"] += bool(duplicates)
+
+    def export(self) -> dict:
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+endpoint_stats = EndpointStats()
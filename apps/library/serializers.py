@@ -1,8 +1,12 @@
-from django.db.models import Avg, F
+import operator
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Avg, Count, F
 
 from rest_framework import serializers
 
-from apps.library import mixins, models
+from apps.library import catalog, loaders, mixins, models, user_ratings
 
 
 class BookAuthorSerializer(serializers.ModelSerializer):
@@ -37,39 +41,107 @@ class BooksCountSerializer(serializers.Serializer):
         return data
 
 
-class BookSerializer(serializers.ModelSerializer):
+class CatalogRelatedField(serializers.PrimaryKeyRelatedField):
+    """Ссылка на автора/жанр, проверяемая по каталогу в памяти воркера без запроса к базе."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        instance = catalog.get_instance(self.queryset.model, pk)
+        if instance is None:
+            self.fail("does_not_exist", pk_value=data)
+        return instance
+
+
+def load_reviews_counts(book_ids) -> dict:
+    counts = dict(
+        models.BookReviewModel.objects
+        .filter(book_id__in=book_ids)
+        .order_by()
+        .values_list("book")
+        .annotate(count=Count("pk"))
+    )
+    return {book_id: counts.get(book_id, 0) for book_id in book_ids}
+
+
+def load_common_ratings(book_ids) -> dict:
+    return dict(
+        models.BookRatingModel.objects
+        .filter(book_id__in=book_ids)
+        .order_by()
+        .values_list("book")
+        .annotate(rating=Avg("rating"))
+    )
+
+
+class BookSerializer(loaders.BatchLoadMixin, serializers.ModelSerializer):
     """Сериализатор книги."""
+    serializer_related_field = CatalogRelatedField
     reviews_count = serializers.ReadOnlyField()
     common_rating = serializers.ReadOnlyField()
+    batch_loads = {
+        "reviews_count": ("pk", load_reviews_counts),
+        "common_rating": ("pk", load_common_ratings),
+    }
+
+    def create(self, validated_data):
+        return self.save_checked(super().create, validated_data)
+
+    def update(self, instance, validated_data):
+        return self.save_checked(super().update, instance, validated_data)
+
+    def save_checked(self, save, *args):
+        """Сохраняет книгу и сразу проверяет ссылки на автора/жанр.
+
+        Каталог воркера мог не знать об удалении автора/жанра: тогда каталог перезагружается,
+        а ошибка внешнего ключа превращается в ошибку валидации поля вместо 500.
+        """
+        try:
+            with transaction.atomic():
+                instance = save(*args)
+                connection.check_constraints(table_names=[models.BookModel._meta.db_table])
+        except IntegrityError:
+            catalog.invalidate()
+            self.check_catalog_fields()
+            raise
+        return instance
+
+    def check_catalog_fields(self):
+        errors = dict()
+        for field_name, value in self.validated_data.items():
+            field = self.fields[field_name]
+            if isinstance(field, CatalogRelatedField) \
+                    and catalog.get_instance(field.queryset.model, value.pk) is None:
+                errors[field_name] = [field.error_messages["does_not_exist"].format(pk_value=value.pk)]
+        if errors:
+            raise serializers.ValidationError(errors)
 
     def to_representation(self, instance):
         context = super().to_representation(instance)
-        context["author"] = instance.author.name
-        context["genre"] = instance.genre.title
+        context["author"] = catalog.get_name(models.BookAuthorModel, instance.author_id)
+        context["genre"] = catalog.get_name(models.BookGenreModel, instance.genre_id)
 
         additional_info = dict()
-        additional_info["reviews_count"] = models.BookReviewModel.objects \
-            .filter(book=instance) \
-            .count()
-
-        common_rating = instance.ratings \
-            .aggregate(rating=Avg("rating"))["rating"]
+        additional_info["reviews_count"] = self.load("reviews_count", instance)
 
+        common_rating = self.load("common_rating", instance)
         if common_rating:
             additional_info["common_rating"] = round(common_rating, 2)
 
-        current_user = self.context["current_user"]
-        try:
-            rated_book = current_user.book_ratings.get(book=instance)
-            additional_info["your_rating"] = rated_book.rating
-        except (AttributeError, models.BookRatingModel.DoesNotExist):
-            pass
+        your_rating = user_ratings.get_context_user_ratings(self.context).get(instance.pk)
+        if your_rating is not None:
+            additional_info["your_rating"] = your_rating
         context["additional_info"] = additional_info
         return context
 
     class Meta:
         model = models.BookModel
-        fields = "__all__"
+        exclude = ("hidden",)
+        list_serializer_class = loaders.BatchLoadListSerializer
 
 
 class BookReviewSerializer(mixins.BookReviewRatingMixin):
@@ -78,19 +150,201 @@ class BookReviewSerializer(mixins.BookReviewRatingMixin):
     class Meta:
         model = models.BookReviewModel
         fields = "__all__"
+        list_serializer_class = loaders.BatchLoadListSerializer
 
 
 class BookRatingSerializer(mixins.BookReviewRatingMixin):
     """Сериализатор рейтинга книги."""
 
+    upsert_result = None
+
     def create(self, validated_data):
-        book_rating, _ = models.BookRatingModel.objects.update_or_create(
-            book=validated_data.get("book"),
-            user=validated_data.get("user"),
-            defaults={"rating": validated_data.get("rating")}
+        book = validated_data.get("book")
+        user = validated_data.get("user")
+        self.upsert_result, = models.BookRatingModel.objects.upsert(
+            user.pk, {book.pk: validated_data.get("rating")}
         )
-        return book_rating
+        return models.BookRatingModel(
+            id=self.upsert_result.id, rating=self.upsert_result.rating, book=book, user=user
+        )
+
+    def update(self, instance, validated_data):
+        # Владелец рейтинга при редактировании не меняется
+        validated_data.pop("user", None)
+        book = validated_data.get("book", instance.book)
+        if book != instance.book and models.BookRatingModel.objects \
+                .filter(book=book, user_id=instance.user_id).exists():
+            raise serializers.ValidationError({"book": "Рейтинг этой книги уже есть."})
+        return super().update(instance, validated_data)
 
     class Meta:
         model = models.BookRatingModel
         fields = "__all__"
+        list_serializer_class = loaders.BatchLoadListSerializer
+
+
+class BookRatingBulkItemSerializer(serializers.Serializer):
+    """Сериализатор одного рейтинга массовой записи, книга проверяется общим запросом."""
+    book = serializers.IntegerField()
+    rating = serializers.IntegerField(min_value=1, max_value=10)
+
+
+class BookIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id для получения нескольких книг одним запросом."""
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_ids(self, ids):
+        if len(ids) > settings.BOOKS_MULTI_GET_MAX_IDS:
+            raise serializers.ValidationError(f"Не больше {settings.BOOKS_MULTI_GET_MAX_IDS} книг за запрос.")
+        return list(dict.fromkeys(ids))
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+    """Сериализатор фонового удаления с числом ещё не удалённых отзывов и рейтингов."""
+    reviews_remaining = serializers.SerializerMethodField()
+    ratings_remaining = serializers.SerializerMethodField()
+
+    @staticmethod
+    def count_remaining(model, job) -> int:
+        if job.status == job.STATUS_DONE:
+            return 0
+        return model.objects.filter(**job.get_dependent_filters()).count()
+
+    def get_reviews_remaining(self, obj):
+        return self.count_remaining(models.BookReviewModel, obj)
+
+    def get_ratings_remaining(self, obj):
+        return self.count_remaining(models.BookRatingModel, obj)
+
+    class Meta:
+        model = models.DeletionJobModel
+        fields = (
+            "key", "kind", "object_id", "status", "reviews_deleted", "ratings_deleted",
+            "reviews_remaining", "ratings_remaining", "created_at", "finished_at"
+        )
+
+
+class BookAuthorReadSerializer(mixins.TimedSerializerMixin, serializers.BaseSerializer):
+    """Быстрый сериализатор автора книги только для чтения."""
+
+    @staticmethod
+    def prepare_queryset(queryset, request):
+        return queryset.values("id", "name")
+
+    def to_representation(self, instance):
+        return instance
+
+
+class BookGenreReadSerializer(mixins.TimedSerializerMixin, serializers.BaseSerializer):
+    """Быстрый сериализатор жанра книги только для чтения."""
+
+    @staticmethod
+    def prepare_queryset(queryset, request):
+        return queryset.values("id", "title")
+
+    def to_representation(self, instance):
+        return instance
+
+
+class BookReadSerializer(mixins.SparseFieldsMixin, mixins.TimedSerializerMixin,
+                         serializers.BaseSerializer):
+    """Быстрый сериализатор книги только для чтения, вывод как у `BookSerializer`."""
+    sparse_fields = (
+        "id", "title", "release_year", "books_count", "description",
+        "author", "genre", "additional_info"
+    )
+    nested_fields = {"additional_info": models.BookQuerySet.additional_info_fields}
+    expandable_fields = ("author", "genre")
+    # Названия авторов и жанров берутся из каталога в памяти, а не джойном
+    related_models = {"author": models.BookAuthorModel, "genre": models.BookGenreModel}
+
+    @classmethod
+    def prepare_queryset(cls, queryset, request):
+        fields, nested_fields, _ = cls.get_requested_fields(request)
+        columns = [
+            f"{name}_id" if name in cls.related_models else name
+            for name in fields
+        ]
+
+        additional_info_fields = ()
+        if "additional_info" in fields:
+            columns.remove("additional_info")
+            # Оценка юзера берётся из словаря его оценок, а не подзапросом на каждую книгу
+            additional_info_fields = tuple(
+                name for name in nested_fields["additional_info"] if name != "your_rating"
+            )
+            columns.extend(additional_info_fields)
+        return queryset \
+            .with_additional_info(getattr(request, "user", None), additional_info_fields) \
+            .values(*columns)
+
+    def represent_related(self, instance, name):
+        model = self.related_models[name]
+        pk = instance[f"{name}_id"]
+        title = catalog.get_name(model, pk)
+        if name in self.expanded_fields:
+            return {"id": pk, catalog.NAME_FIELDS[model]: title}
+        return title
+
+    def represent_author(self, instance):
+        return self.represent_related(instance, "author")
+
+    def represent_genre(self, instance):
+        return self.represent_related(instance, "genre")
+
+    def represent_additional_info(self, instance):
+        fields = self.requested_nested_fields["additional_info"]
+        additional_info = dict()
+        if "reviews_count" in fields:
+            additional_info["reviews_count"] = instance["reviews_count"]
+        if instance.get("common_rating"):
+            additional_info["common_rating"] = round(instance["common_rating"], 2)
+        if "your_rating" in fields:
+            your_rating = user_ratings.get_context_user_ratings(self.context).get(instance["id"])
+            if your_rating is not None:
+                additional_info["your_rating"] = your_rating
+        return additional_info
+
+
+class BookReviewRatingReadSerializer(mixins.SparseFieldsMixin, mixins.TimedSerializerMixin,
+                                     serializers.BaseSerializer):
+    """Базовый быстрый сериализатор отзыва/рейтинга книги только для чтения."""
+    expandable_fields = ("user",)
+
+    @classmethod
+    def prepare_queryset(cls, queryset, request):
+        fields, _, _ = cls.get_requested_fields(request)
+        # Ключи связей нужны всегда: по `user_id` проверяется владелец
+        columns = ["user_id", "book_id"]
+        columns.extend(name for name in fields if name not in ("user", "book_title"))
+        related = []
+        if "user" in fields:
+            related.append("user")
+            columns.append("user__username")
+        if "book_title" in fields:
+            related.append("book")
+            columns.append("book__title")
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+    def get_field_getter(self, name):
+        return operator.attrgetter(name)
+
+    def represent_user(self, instance):
+        if "user" in self.expanded_fields:
+            return {"id": instance.user_id, "username": instance.user.username}
+        return instance.user.username
+
+    def represent_book_title(self, instance):
+        return instance.book.title
+
+
+class BookReviewReadSerializer(BookReviewRatingReadSerializer):
+    """Быстрый сериализатор отзыва книги только для чтения."""
+    sparse_fields = ("id", "review", "user", "book_title")
+
+
+class BookRatingReadSerializer(BookReviewRatingReadSerializer):
+    """Быстрый сериализатор рейтинга книги только для чтения."""
+    sparse_fields = ("id", "rating", "user", "book_title")
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.library import book_cache, catalog, changes, models, outbox, user_ratings
+
+
+BOOK = models.CatalogChangeModel.KIND_BOOK
+
+
+def record_book_changes(book_ids, deleted=False):
+    """Записывает изменение книг в ленту и помечает устаревшими их закэшированные ответы."""
+    book_ids = set(book_ids)
+    if book_ids:
+        changes.record(BOOK, book_ids, deleted=deleted)
+        book_cache.invalidate_books(book_ids)
+
+
+@receiver(post_save, sender=models.BookRatingModel)
+@receiver(post_save, sender=models.BookReviewModel)
+def review_rating_saved(sender, instance, created, **kwargs):
+    topic = "rating.changed" if sender is models.BookRatingModel else "review.changed"
+    if sender is models.BookRatingModel:
+        user_ratings.update_cached_ratings(instance.user_id)
+    else:
+        book_cache.invalidate_reviews([instance.book_id])
+    # Общий рейтинг и число отзывов входят в представление книги
+    if created or sender is models.BookRatingModel:
+        record_book_changes([instance.book_id])
+    outbox.enqueue(topic, {
+        "id": instance.pk,
+        "book_id": instance.book_id,
+        "user_id": instance.user_id,
+        "created": created,
+    })
+
+
+@receiver(post_delete, sender=models.BookRatingModel)
+@receiver(post_delete, sender=models.BookReviewModel)
+def review_rating_deleted(sender, instance, **kwargs):
+    topic = "rating.deleted" if sender is models.BookRatingModel else "review.deleted"
+    if sender is models.BookRatingModel:
+        user_ratings.invalidate_cached_ratings(instance.user_id)
+    else:
+        book_cache.invalidate_reviews([instance.book_id])
+    record_book_changes([instance.book_id])
+    outbox.enqueue(topic, {
+        "id": instance.pk,
+        "book_id": instance.book_id,
+        "user_id": instance.user_id,
+    })
+
+
+@receiver(models.ratings_upserted, sender=models.BookRatingModel)
+def ratings_upserted(sender, user_id, results, **kwargs):
+    if any(result.changed for result in results):
+        user_ratings.update_cached_ratings(user_id)
+    record_book_changes(result.book_id for result in results if result.changed)
+    outbox.enqueue_many("rating.changed", [
+        {
+            "id": result.id,
+            "book_id": result.book_id,
+            "user_id": user_id,
+            "created": result.created,
+            "rating": result.rating,
+            "old_rating": result.old_rating,
+        }
+        for result in results if result.changed
+    ])
+
+
+@receiver(post_save, sender=models.BookModel)
+def book_saved(sender, instance, created, update_fields, **kwargs):
+    record_book_changes([instance.pk])
+    outbox.enqueue("book.changed", {
+        "book_id": instance.pk,
+        "created": created,
+        "fields": sorted(update_fields) if update_fields else None,
+    })
+
+
+@receiver(post_delete, sender=models.BookModel)
+def book_deleted(sender, instance, **kwargs):
+    record_book_changes([instance.pk], deleted=True)
+    outbox.enqueue("book.deleted", {"book_id": instance.pk})
+
+
+@receiver(post_save, sender=models.BookAuthorModel)
+@receiver(post_save, sender=models.BookGenreModel)
+def author_genre_saved(sender, instance, **kwargs):
+    kind = models.CatalogChangeModel.KIND_AUTHOR if sender is models.BookAuthorModel \
+        else models.CatalogChangeModel.KIND_GENRE
+    changes.record(kind, [instance.pk])
+    transaction.on_commit(catalog.invalidate)
+    book_cache.invalidate_names()
+    outbox.enqueue(f"{kind}.changed", {f"{kind}_id": instance.pk})
+
+
+@receiver(post_delete, sender=models.BookAuthorModel)
+@receiver(post_delete, sender=models.BookGenreModel)
+def author_genre_deleted(sender, instance, **kwargs):
+    kind = models.CatalogChangeModel.KIND_AUTHOR if sender is models.BookAuthorModel \
+        else models.CatalogChangeModel.KIND_GENRE
+    changes.record(kind, [instance.pk], deleted=True)
+    transaction.on_commit(catalog.invalidate)
+    book_cache.invalidate_names()
@@ -0,0 +1,57 @@
+import time
+import uuid
+
+from django.conf import settings
+
+from apps.library import metrics
+
+
+def make_entry(value, generation, ttl: int) -> dict:
+    return {"value": value, "generation": generation, "expires_at": time.time() + ttl}
+
+
+def is_fresh(entry, generation) -> bool:
+    return entry is not None and entry["generation"] == generation and entry["expires_at"] > time.time()
+
+
+def get_or_compute(cache, key: str, compute, ttl: int, stale_ttl: int, generation=None, name="default"):
+    """Значение из кэша или результат `compute()`, который одновременно считает только один процесс.
+
+    Запись устаревает через `ttl` секунд или при смене `generation`. Пока владелец
+    блокировки `<key>:lock` пересчитывает, остальные получают устаревшее значение
+    (ещё `stale_ttl` секунд), а без него ждут пересчёт до `SINGLE_FLIGHT_WAIT_TIMEOUT`
+    секунд и после этого считают сами.
+    """
+    entry = cache.get(key)
+    hit = is_fresh(entry, generation)
+    metrics.observe_cache(name, hit)
+    if hit:
+        metrics.observe_single_flight(name, "hit")
+        return entry["value"]
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, make_entry(value, generation, ttl), ttl + stale_ttl)
+        finally:
+            # Блокировка могла истечь и достаться другому процессу
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        metrics.observe_single_flight(name, "computed")
+        return value
+
+    if entry is not None:
+        metrics.observe_single_flight(name, "stale")
+        return entry["value"]
+
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            metrics.observe_single_flight(name, "waited")
+            return entry["value"]
+    metrics.observe_single_flight(name, "timeout")
+    return compute()
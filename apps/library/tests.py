@@ -1,24 +1,59 @@
+import datetime
+import decimal
+import io
+import json
+import tempfile
+import uuid
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, models, transaction
 from django.db.models import ProtectedError
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
 
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
+from rest_framework.serializers import ModelSerializer
 
+from apps.library import (
+    admin, benchmark, book_cache, book_cards, catalog, deletions, loaders, outbox, serializers,
+    single_flight, throttling, views
+)
 from apps.library.models import (
     BookAuthorModel,
     BookGenreModel,
     BookModel,
     BookReviewModel,
     BookRatingModel,
+    CatalogChangeModel,
+    DeletionJobModel,
+    OutboxEventModel,
+    UserModel,
 )
+from apps.library.parsers import ORJSONParser
+from apps.library.queries import QueryBudgetExceeded, assert_query_budget, endpoint_stats
+from apps.library.renderers import ORJSONRenderer
 from apps.users.tests import BaseUserSetUp
 
 
+@override_settings(QUERY_BUDGET_RAISE=True)
 class BaseSetUp(BaseUserSetUp):
     """Базовый класс с общими данными для тестирования моделей."""
 
     def setUp(self):
         """Подготовка к тестированию приложения."""
         super().setUp()
+        throttling.reset_store()
+        catalog.invalidate()
         self.author1 = BookAuthorModel.objects.create(name="Author1")
         self.author2 = BookAuthorModel.objects.create(name="Author2")
 
@@ -274,6 +309,19 @@ class BookTests(BaseSetUp):
         response = self.client.post(reverse("book-list"), data={})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(LOCAL_CATALOG_CHECK_INTERVAL=60)
+    def test_fail_create_book_with_stale_author_by_admin(self):
+        author = BookAuthorModel.objects.create(name="Author3")
+        self.client.get(reverse("book-list"))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {BookAuthorModel._meta.db_table} WHERE id = %s", [author.pk])
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.post(reverse("book-list"), data={**self.new_book_data, "author": author.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("author", response.json())
+        self.assertFalse(BookModel.objects.filter(title="NewBook").exists())
+
     def test_fail_create_book_by_user(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
         response = self.client.post(reverse("book-list"), data=self.new_book_data)
@@ -412,7 +460,7 @@ class BookTests(BaseSetUp):
     def test_delete_book_by_admin(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
         response = self.client.delete(reverse("book-detail", kwargs={"pk": self.book1.pk}))
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_fail_delete_book_by_user(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
@@ -756,3 +804,1147 @@ class BookRatingTest(BaseSetUp):
     def test_fail_delete_rating_by_anonymous_user(self):
         response = self.client.delete(reverse("rating-detail", kwargs={"pk": self.rating0.pk}))
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BaseReviewRatingSetUp(BaseSetUp):
+    """Базовый класс с отзывами и рейтингами книг."""
+
+    def setUp(self):
+        super().setUp()
+        BookReviewModel.objects.create(review="Review0", book=self.book1, user=self.superuser)
+        BookReviewModel.objects.create(review="Review1", book=self.book1, user=self.user1)
+        BookRatingModel.objects.create(rating=9, book=self.book1, user=self.superuser)
+        BookRatingModel.objects.create(rating=8, book=self.book1, user=self.user1)
+        BookRatingModel.objects.create(rating=8, book=self.book1, user=self.user2)
+        BookRatingModel.objects.create(rating=7, book=self.book2, user=self.user2)
+
+
+class ReadSerializerTests(BaseReviewRatingSetUp):
+    """Тестирование совпадения быстрых сериализаторов чтения с обычными."""
+
+    def assertSameContent(self, url, serializer_class, queryset, user):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        many = not isinstance(queryset, models.Model)
+        serializer = serializer_class(queryset, many=many, context={"current_user": user})
+        self.assertEqual(response.content, JSONRenderer().render(serializer.data))
+
+    def assertSameBooks(self, user):
+        self.assertSameContent(
+            reverse("book-list"), serializers.BookSerializer, BookModel.objects.all(), user
+        )
+        self.assertSameContent(
+            reverse("book-detail", kwargs={"pk": self.book1.pk}),
+            serializers.BookSerializer, self.book1, user
+        )
+
+    def test_books_by_anonymous_user(self):
+        self.assertSameBooks(AnonymousUser())
+
+    def test_books_by_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        self.assertSameBooks(self.user1)
+
+    def test_authors_genres_reviews_ratings(self):
+        for basename, serializer_class, model in (
+            ("author", serializers.BookAuthorSerializer, BookAuthorModel),
+            ("genre", serializers.BookGenreSerializer, BookGenreModel),
+            ("review", serializers.BookReviewSerializer, BookReviewModel),
+            ("rating", serializers.BookRatingSerializer, BookRatingModel),
+        ):
+            with self.subTest(basename):
+                instance = model.objects.first()
+                self.assertSameContent(
+                    reverse(f"{basename}-list"), serializer_class, model.objects.all(), None
+                )
+                self.assertSameContent(
+                    reverse(f"{basename}-detail", kwargs={"pk": instance.pk}),
+                    serializer_class, instance, None
+                )
+
+    @override_settings(BOOK_CARDS_ENABLED=False)
+    def test_book_list_queries_count(self):
+        catalog.get_name(BookAuthorModel, self.author1.pk)
+        with self.assertNumQueries(1):
+            self.client.get(reverse("book-list"))
+
+
+class SparseFieldsTests(BaseReviewRatingSetUp):
+    """Тестирование параметров `?fields=` и `?expand=`."""
+
+    def test_book_fields(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("book-list"), {"fields": "title,author"})
+        self.assertEqual(response.json()[0], {"id": 1, "title": "Book1", "author": "Author1"})
+        self.assertNotIn("description", context.captured_queries[0]["sql"])
+        self.assertNotIn("AVG", context.captured_queries[0]["sql"])
+
+    def test_book_nested_fields(self):
+        response = self.client.get(
+            reverse("book-detail", kwargs={"pk": self.book1.pk}),
+            {"fields": "title,additional_info.common_rating"}
+        )
+        self.assertEqual(
+            response.json(),
+            {"id": 1, "title": "Book1", "additional_info": {"common_rating": 8.33}}
+        )
+
+    def test_book_expand(self):
+        response = self.client.get(
+            reverse("book-detail", kwargs={"pk": self.book1.pk}),
+            {"fields": "author,genre", "expand": "author,genre"}
+        )
+        self.assertEqual(response.json(), {
+            "id": 1,
+            "author": {"id": self.author1.pk, "name": "Author1"},
+            "genre": {"id": self.genre1.pk, "title": "Genre1"},
+        })
+
+    def test_review_fields_and_expand(self):
+        response = self.client.get(
+            reverse("review-list"), {"fields": "user", "expand": "user"}
+        )
+        self.assertEqual(
+            response.json()[0],
+            {"id": 1, "user": {"id": self.superuser.pk, "username": self.superuser.username}}
+        )
+
+    def test_owner_review_fields(self):
+        review = BookReviewModel.objects.get(user=self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.get(reverse("review-detail", kwargs={"pk": review.pk}), {"fields": "review"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"id": review.pk, "review": "Review1"})
+
+    def test_rating_fields(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("rating-list"), {"fields": "rating"})
+        self.assertEqual(response.json()[0], {"id": 1, "rating": 9})
+        self.assertNotIn("JOIN", context.captured_queries[0]["sql"])
+
+
+class QueryBudgetTests(BaseSetUp):
+    """Тестирование бюджета SQL-запросов и поиска N+1."""
+
+    def test_assert_query_budget(self):
+        with assert_query_budget(2):
+            list(BookModel.objects.all())
+
+    def test_savepoints_counted(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(2):
+                with transaction.atomic():
+                    list(BookModel.objects.all())
+
+    def test_fail_assert_query_budget_reports_n_plus_one(self):
+        for i in range(5):
+            BookModel.objects.create(
+                title=f"Book{i}", release_year=2020, description="Description",
+                author=self.author1, genre=self.genre1
+            )
+        with self.assertRaisesRegex(QueryBudgetExceeded, "N\\+1 candidate \\(7x\\)"):
+            with assert_query_budget(1):
+                for book in BookModel.objects.all():
+                    book.author.name
+
+    def test_fail_view_exceeds_query_budget(self):
+        with mock.patch.object(views.BookViewSet, "query_budget", {"list": 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("book-list"))
+
+    @override_settings(BOOK_CARDS_ENABLED=False)
+    def test_get_query_stats_by_admin(self):
+        endpoint_stats.reset()
+        catalog.get_name(BookAuthorModel, self.author1.pk)
+        self.client.get(reverse("book-list"))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.get(reverse("query-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["book-list"]["requests"], 1)
+        self.assertEqual(response.json()["book-list"]["queries"], 1)
+
+    def test_fail_get_query_stats_by_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.get(reverse("query-stats"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MetricsTests(BaseSetUp):
+    """Тестирование метрик Prometheus."""
+
+    def test_get_metrics(self):
+        self.client.get(reverse("book-list"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertIn(
+            'librest_http_request_duration_seconds_count{method="GET",status="2xx",view="book-list"}',
+            content
+        )
+        self.assertIn('librest_db_queries_total{view="book-list"}', content)
+        self.assertIn('librest_serializer_duration_seconds_count{view="book-list"}', content)
+        self.assertIn("librest_http_requests_in_progress", content)
+
+    @override_settings(USER_RATINGS_CACHE_ALIAS="default")
+    def test_cache_requests(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        self.client.get(reverse("book-list"))
+        self.client.get(reverse("book-list"))
+        content = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('librest_cache_requests_total{cache="user-ratings",result="hit"}', content)
+        self.assertIn('librest_cache_requests_total{cache="user-ratings",result="miss"}', content)
+
+
+class BenchmarkTests(BaseSetUp):
+    """Тестирование генератора данных и сравнения с базовой линией."""
+
+    def test_generate_dataset(self):
+        dataset = benchmark.generate_dataset(
+            authors=2, genres=2, books=10, users=3, ratings=20, reviews=5
+        )
+        self.assertEqual(len(dataset["book_ids"]), 10)
+        self.assertEqual(len(dataset["tokens"]), 3)
+        self.assertEqual(BookRatingModel.objects.count(), 20)
+        self.assertEqual(BookReviewModel.objects.count(), 5)
+
+    def test_run_scenario_fewer_requests_than_threads(self):
+        def scenario(client, rnd, dataset):
+            return client.get(reverse("metrics"))
+
+        self.assertEqual(benchmark.run_scenario(scenario, {}, requests=3, concurrency=4)["requests"], 3)
+        self.assertEqual(benchmark.run_scenario(scenario, {}, requests=10, concurrency=4)["requests"], 10)
+        self.assertEqual(benchmark.run_scenario(scenario, {}, requests=0, concurrency=4)["p95_ms"], 0.0)
+
+    def test_compare_results(self):
+        baseline = {"scenarios": {"book-list": {
+            "rps": 100, "p95_ms": 10, "queries_per_request": 1, "errors": 0
+        }}}
+        results = {"scenarios": {"book-list": {
+            "rps": 95, "p95_ms": 11, "queries_per_request": 1, "errors": 0
+        }}}
+        self.assertEqual(benchmark.compare_results(baseline, results, 0.2), [])
+
+        results["scenarios"]["book-list"].update(p95_ms=20, queries_per_request=2)
+        self.assertEqual(len(benchmark.compare_results(baseline, results, 0.2)), 2)
+
+
+class ProfilerTests(BaseSetUp):
+    """Тестирование сэмплирующего профайлера запросов."""
+
+    def setUp(self):
+        super().setUp()
+        profiles_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profiles_dir.cleanup)
+        settings_override = override_settings(
+            PROFILER_ENABLED=True, PROFILER_DIR=profiles_dir.name,
+            PROFILER_SLOW_REQUEST_THRESHOLD=None, PROFILER_MAX_FILES=2
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_profile_by_admin_header(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.get(reverse("book-list"), HTTP_X_PROFILE="1")
+        name = response["X-Profile-Id"]
+
+        response = self.client.get(reverse("profile-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["name"], name)
+        self.assertEqual(response.json()[0]["view"], "book-list")
+
+        response = self.client.get(reverse("profile-detail", kwargs={"name": name}))
+        self.assertTrue(any("library_bookmodel" in query["sql"] for query in response.json()["sql"]))
+
+        response = self.client.get(reverse("profile-folded", kwargs={"name": name}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    def test_fail_profile_by_user_header(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.get(reverse("book-list"), HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile-Id", response)
+        response = self.client.get(reverse("profile-list"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_profile_slow_requests_ring_buffer(self):
+        with override_settings(PROFILER_SLOW_REQUEST_THRESHOLD=0):
+            for _ in range(3):
+                self.client.get(reverse("book-list"))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.get(reverse("profile-list"))
+        self.assertEqual(len(response.json()), 2)
+
+    def test_fail_get_not_found_profile(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.get(reverse("profile-detail", kwargs={"name": "missing.json"}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fail_get_profile_by_invalid_name(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        for name in ("..", ".hidden.json", "profile.txt"):
+            response = self.client.get(reverse("profile-detail", kwargs={"name": name}))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {"ratings.user": "2/min", "ratings.ip": "3/min"},
+})
+class ThrottlingTests(BaseSetUp):
+    """Тестирование ограничения записи корзиной токенов."""
+
+    def post_rating(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return self.client.post(reverse("rating-list"), data={"rating": 5, "book": self.book1.pk})
+
+    def test_throttle_user(self):
+        response = self.post_rating(self.token_user1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["X-RateLimit-Limit"], "2")
+        self.assertEqual(response["X-RateLimit-Remaining"], "1")
+
+        response = self.post_rating(self.token_user1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+
+        response = self.post_rating(self.token_user1)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_throttle_ip(self):
+        self.post_rating(self.token_user1)
+        self.post_rating(self.token_user1)
+        response = self.post_rating(self.token_user2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.post_rating(self.token_user2)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_not_throttle_read(self):
+        for _ in range(3):
+            self.post_rating(self.token_user1)
+        response = self.client.get(reverse("rating-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-RateLimit-Remaining", response)
+
+    def test_cache_store_window(self):
+        cache.clear()
+        store = throttling.CacheBucketStore("default")
+        self.assertEqual(store.consume("test", 30, 60, now=120), (True, 150))
+        self.assertEqual(store.consume("test", 30, 60, now=130), (True, 190))
+        allowed, arrival_time = store.consume("test", 30, 60, now=140)
+        self.assertFalse(allowed)
+        # Ждать до конца окна, как считает TokenBucketThrottle.wait
+        self.assertEqual(arrival_time - 60 + 30 - 140, 40)
+        self.assertTrue(store.consume("test", 30, 60, now=180)[0])
+
+    def test_gcra_refill(self):
+        allowed, arrival_time = throttling.get_arrival_time(None, 30, 60, now=0)
+        self.assertEqual((allowed, arrival_time), (True, 30))
+        allowed, arrival_time = throttling.get_arrival_time(arrival_time, 30, 60, now=0)
+        self.assertEqual((allowed, arrival_time), (True, 60))
+        self.assertFalse(throttling.get_arrival_time(arrival_time, 30, 60, now=0)[0])
+        self.assertTrue(throttling.get_arrival_time(arrival_time, 30, 60, now=30)[0])
+
+
+class OutboxTests(BaseSetUp):
+    """Тестирование исходящей очереди событий."""
+
+    def setUp(self):
+        super().setUp()
+        OutboxEventModel.objects.all().delete()
+
+    def test_enqueue_on_write(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.post(reverse("rating-list"), data={"rating": 5, "book": self.book1.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        event = OutboxEventModel.objects.get()
+        self.assertEqual(event.topic, "rating.changed")
+        self.assertEqual(event.payload["book_id"], self.book1.pk)
+        self.assertEqual(event.payload["user_id"], self.user1.pk)
+
+        response = self.client.patch(
+            reverse("book-change-count", kwargs={"pk": self.book1.pk}), data={"value": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(OutboxEventModel.objects.filter(topic="book.changed").exists())
+
+    def test_idempotency_key(self):
+        outbox.enqueue("test", {}, key="same")
+        outbox.enqueue("test", {}, key="same")
+        self.assertEqual(OutboxEventModel.objects.count(), 1)
+
+    def test_process_batch(self):
+        handled = []
+        outbox.enqueue("test", {"n": 1})
+        outbox.enqueue("test", {"n": 2})
+        outbox.enqueue("unhandled", {})
+        with mock.patch.dict(outbox._handlers, {"test": [handled.extend]}):
+            self.assertEqual(outbox.process_batch(batch_size=10), 3)
+            self.assertEqual(outbox.process_batch(batch_size=10), 0)
+        self.assertEqual([event.payload["n"] for event in handled], [1, 2])
+        self.assertFalse(OutboxEventModel.objects.filter(processed_at__isnull=True).exists())
+
+    def test_worker_command(self):
+        outbox.enqueue("test", {})
+        output = io.StringIO()
+        call_command("run_outbox_worker", "--once", stdout=output)
+        self.assertEqual(output.getvalue(), "Processed 1 events\n")
+        self.assertFalse(OutboxEventModel.objects.filter(processed_at__isnull=True).exists())
+
+    def test_retry_with_backoff(self):
+        outbox.enqueue("test", {})
+        failing_handler = mock.Mock(side_effect=ValueError("boom"))
+        with mock.patch.dict(outbox._handlers, {"test": [failing_handler]}), \
+                self.assertLogs("apps.library.outbox", "ERROR"):
+            self.assertEqual(outbox.process_batch(), 1)
+            self.assertEqual(outbox.process_batch(), 0)
+        event = OutboxEventModel.objects.get()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("boom", event.last_error)
+        self.assertGreater(event.available_at, timezone.now())
+
+
+class RatingUpsertTests(BaseSetUp):
+    """Тестирование записи рейтинга через INSERT ... ON CONFLICT."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.rating = BookRatingModel.objects.create(rating=8, book=self.book1, user=self.user1)
+
+    def test_upsert_result(self):
+        results = BookRatingModel.objects.upsert(self.user1.pk, {self.book1.pk: 3, self.book2.pk: 5})
+        results = {result.book_id: result for result in results}
+        self.assertEqual(results[self.book1.pk].id, self.rating.pk)
+        self.assertEqual(results[self.book1.pk].old_rating, 8)
+        self.assertFalse(results[self.book1.pk].created)
+        self.assertTrue(results[self.book1.pk].changed)
+        self.assertIsNone(results[self.book2.pk].old_rating)
+        self.assertTrue(results[self.book2.pk].created)
+
+        result, = BookRatingModel.objects.upsert(self.user1.pk, {self.book1.pk: 3})
+        self.assertFalse(result.changed)
+        self.assertEqual(BookRatingModel.objects.filter(user=self.user1).count(), 2)
+
+    def test_upsert_outbox_event(self):
+        OutboxEventModel.objects.all().delete()
+        BookRatingModel.objects.upsert(self.user1.pk, {self.book1.pk: 3})
+        BookRatingModel.objects.upsert(self.user1.pk, {self.book1.pk: 3})
+        event = OutboxEventModel.objects.get()
+        self.assertEqual(event.payload["old_rating"], 8)
+        self.assertEqual(event.payload["rating"], 3)
+
+    def test_idempotency_key(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        data = {"rating": 2, "book": self.book2.pk}
+        response = self.client.post(reverse("rating-list"), data=data, HTTP_IDEMPOTENCY_KEY="abc")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+        with CaptureQueriesContext(connection) as context:
+            replayed = self.client.post(reverse("rating-list"), data=data, HTTP_IDEMPOTENCY_KEY="abc")
+        self.assertFalse([query for query in context if "library_bookratingmodel" in query["sql"]])
+        self.assertEqual(replayed.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replayed["Idempotent-Replayed"], "true")
+        self.assertEqual(replayed.json(), response.json())
+
+        response = self.client.post(
+            reverse("rating-list"), data={**data, "rating": 3}, HTTP_IDEMPOTENCY_KEY="abc"
+        )
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_update_keeps_owner(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.put(
+            reverse("rating-detail", kwargs={"pk": self.rating.pk}),
+            data={"rating": 1, "book": self.book1.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(BookRatingModel.objects.get(pk=self.rating.pk).user, self.user1)
+
+    def test_fail_update_to_already_rated_book(self):
+        BookRatingModel.objects.create(rating=5, book=self.book2, user=self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.put(
+            reverse("rating-detail", kwargs={"pk": self.rating.pk}),
+            data={"rating": 1, "book": self.book2.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RatingBulkTests(BaseSetUp):
+    """Тестирование массовой записи рейтингов."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        BookRatingModel.objects.create(rating=8, book=self.book1, user=self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+
+    def post_ratings(self, data):
+        return self.client.post(reverse("rating-bulk"), data=data, format="json")
+
+    def test_bulk_ratings(self):
+        with assert_query_budget(9):
+            response = self.post_ratings([
+                {"book": self.book1.pk, "rating": 8},
+                {"book": self.book2.pk, "rating": 3},
+                {"book": 0, "rating": 3},
+                {"book": self.book2.pk, "rating": 4},
+                {"book": self.book1.pk, "rating": 11},
+            ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()
+        self.assertEqual([result["status"] for result in results],
+                         ["unchanged", "created", "error", "error", "error"])
+        self.assertEqual(results[1]["rating"], 3)
+        self.assertIn("rating", results[4]["errors"])
+        self.assertEqual(
+            dict(BookRatingModel.objects.filter(user=self.user1).values_list("book", "rating")),
+            {self.book1.pk: 8, self.book2.pk: 3}
+        )
+
+        response = self.post_ratings([{"book": self.book2.pk, "rating": 5}])
+        self.assertEqual(response.json()[0]["status"], "updated")
+
+    def test_fail_bulk_ratings(self):
+        self.assertEqual(self.post_ratings({"book": self.book1.pk}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        with override_settings(RATINGS_BULK_MAX_ITEMS=1):
+            response = self.post_ratings([{"book": self.book1.pk, "rating": 1}] * 2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.credentials()
+        response = self.post_ratings([{"book": self.book1.pk, "rating": 1}])
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserRatingsTests(BaseReviewRatingSetUp):
+    """Тестирование словаря оценок юзера для `your_rating`."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+
+    def get_your_ratings(self):
+        response = self.client.get(reverse("book-list"))
+        return {book["id"]: book["additional_info"].get("your_rating") for book in response.json()}
+
+    def test_your_rating_without_join(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse("book-list"))
+        book_query, = [query["sql"] for query in context if "library_bookmodel" in query["sql"]]
+        self.assertNotIn('"user_id" =', book_query)
+        self.assertEqual(self.get_your_ratings(), {self.book1.pk: 8, self.book2.pk: None})
+
+    def test_ratings_loaded_by_user_only(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse("book-list"), {"fields": "additional_info.your_rating"})
+        rating_query, = [query["sql"] for query in context if "library_bookratingmodel" in query["sql"]]
+        self.assertNotIn("IN (", rating_query)
+
+    @override_settings(USER_RATINGS_CACHE_ALIAS="default")
+    @mock.patch("apps.library.user_ratings.transaction.on_commit", lambda func: func())
+    def test_cached_updated_on_write(self):
+        self.assertEqual(self.get_your_ratings(), {self.book1.pk: 8, self.book2.pk: None})
+        with self.assertNumQueries(2):
+            self.client.get(reverse("book-list"))
+
+        BookRatingModel.objects.upsert(self.user1.pk, {self.book2.pk: 4})
+        # Оценки уже записаны в кэш: токен и книги
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get_your_ratings(), {self.book1.pk: 8, self.book2.pk: 4})
+
+        BookRatingModel.objects.filter(user=self.user1, book=self.book1).delete()
+        self.assertEqual(self.get_your_ratings(), {self.book1.pk: None, self.book2.pk: 4})
+
+
+class StartupTests(BaseSetUp):
+    """Тестирование ленивой документации и аудита импортов."""
+
+    def test_lazy_docs(self):
+        response = self.client.get(reverse("schema-swagger-ui"), {"format": "openapi"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("/api/v1/books/", response.json()["paths"])
+
+    def test_build_schema(self):
+        schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(schema_dir.cleanup)
+        with override_settings(API_SCHEMA_DIR=schema_dir.name, STATIC_ROOT=schema_dir.name):
+            response = self.client.get(reverse("schema-swagger-ui"))
+            self.assertContains(response, reverse("schema-json"))
+            response = self.client.get(reverse("schema-json"))
+            self.assertIn("/api/v1/books/", response.json()["paths"])
+
+            call_command("build_schema", stdout=io.StringIO())
+            name = json.loads(Path(schema_dir.name, "manifest.json").read_text())["openapi"]
+            self.assertRegex(name, r"^openapi\.[0-9a-f]{12}\.json$")
+            schema = json.loads(Path(schema_dir.name, name).read_text())
+            self.assertEqual(schema["paths"].keys(), response.json()["paths"].keys())
+
+            cache.clear()
+            response = self.client.get(reverse("schema-redoc"))
+            self.assertContains(response, f"/static/{name}")
+
+    def test_build_schema_skipped_without_docs(self):
+        schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(schema_dir.cleanup)
+        output = io.StringIO()
+        with override_settings(API_DOCS_ENABLED=False, API_SCHEMA_DIR=schema_dir.name):
+            call_command("build_schema", stdout=output)
+        self.assertIn("disabled", output.getvalue())
+        self.assertEqual(list(Path(schema_dir.name).iterdir()), [])
+
+    def test_import_time(self):
+        output = io.StringIO()
+        call_command("import_time", "--limit", "3", stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("startup "))
+        self.assertEqual(len(lines), 5)
+
+
+class CacheControlTests(BaseSetUp):
+    """Тестирование заголовков кэширования каталога."""
+
+    def test_anonymous_catalog_is_public(self):
+        for url in (reverse("book-list"), reverse("book-detail", kwargs={"pk": self.book1.pk}),
+                    reverse("author-list"), reverse("genre-list")):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    response["Cache-Control"],
+                    f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}, "
+                    f"stale-while-revalidate={settings.CATALOG_CACHE_STALE_WHILE_REVALIDATE}"
+                )
+                self.assertIn("Authorization", response["Vary"])
+                self.assertIn("Cookie", response["Vary"])
+
+    def test_user_catalog_is_private(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+
+    def test_write_is_not_cached(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.post(reverse("book-list"), data=self.new_book_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Cache-Control", response)
+
+
+class AdminTests(BaseReviewRatingSetUp):
+    """Тестирование админки на больших таблицах."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.superuser)
+
+    def get_changelist_queries(self, model_name):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(f"admin:library_{model_name}_changelist"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow(self):
+        for model_name in ("bookmodel", "bookratingmodel", "bookreviewmodel"):
+            with self.subTest(model_name):
+                queries_count = self.get_changelist_queries(model_name)
+                BookModel.objects.bulk_create(
+                    BookModel(title=f"Extra{i}", release_year=2000, description="",
+                              author=self.author1, genre=self.genre1)
+                    for i in range(5)
+                )
+                BookRatingModel.objects.bulk_create(
+                    BookRatingModel(rating=5, book=book, user=self.superuser)
+                    for book in BookModel.objects.filter(title__startswith="Extra", ratings=None)
+                )
+                self.assertEqual(self.get_changelist_queries(model_name), queries_count)
+
+    def test_autocomplete(self):
+        response = self.client.get(reverse("admin:library_bookmodel_autocomplete"), {"term": "book"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_estimated_count_paginator_falls_back_to_count(self):
+        paginator = admin.EstimatedCountPaginator(BookModel.objects.order_by("id"), 10)
+        self.assertEqual(paginator.count, 2)
+
+
+class ChangesFeedTests(BaseSetUp):
+    """Тестирование ленты изменений каталога."""
+
+    def get_changes(self, since, **params):
+        response = self.client.get(reverse("book-changes"), {"since": since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_changes_since_token(self):
+        feed = self.get_changes(0)
+        self.assertEqual(
+            [(change["type"], change["id"]) for change in feed["changes"]],
+            [("author", self.author1.pk), ("author", self.author2.pk),
+             ("genre", self.genre1.pk), ("genre", self.genre2.pk),
+             ("book", self.book1.pk), ("book", self.book2.pk)]
+        )
+        self.assertEqual(feed["changes"][4]["data"]["title"], "Book1")
+        self.assertFalse(feed["has_more"])
+        token = feed["next"]
+        self.assertEqual(self.get_changes(token)["changes"], [])
+
+        BookRatingModel.objects.upsert(self.user1.pk, {self.book2.pk: 6})
+        book1_pk = self.book1.pk
+        self.book1.delete()
+        feed = self.get_changes(token)
+        self.assertEqual(
+            [(change["id"], change["deleted"]) for change in feed["changes"]],
+            [(self.book2.pk, False), (book1_pk, True)]
+        )
+        self.assertEqual(feed["changes"][0]["data"]["additional_info"]["common_rating"], 6)
+        self.assertNotIn("data", feed["changes"][1])
+
+    def test_changes_pagination(self):
+        feed = self.get_changes(0, limit=4)
+        self.assertEqual(len(feed["changes"]), 4)
+        self.assertTrue(feed["has_more"])
+        feed = self.get_changes(feed["next"], limit=4)
+        self.assertEqual(len(feed["changes"]), 2)
+        self.assertFalse(feed["has_more"])
+
+    def test_one_entry_per_object(self):
+        self.book1.title = "Book1 v2"
+        self.book1.save()
+        self.book1.save()
+        self.assertEqual(
+            CatalogChangeModel.objects.filter(kind="book", object_id=self.book1.pk).count(), 1
+        )
+
+    def test_old_numeric_token(self):
+        feed = self.get_changes(0, limit=4)
+        self.assertEqual(len(self.get_changes(feed["next"].split(".")[1])["changes"]), 2)
+
+    def test_fail_invalid_token(self):
+        response = self.client.get(reverse("book-changes"), {"since": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CatalogTests(BaseSetUp):
+    """Тестирование каталога авторов и жанров в памяти воркера."""
+
+    def test_names_without_queries(self):
+        catalog.get_name(BookAuthorModel, self.author1.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog.get_name(BookAuthorModel, self.author1.pk), "Author1")
+            self.assertEqual(catalog.get_name(BookGenreModel, self.genre2.pk), "Genre2")
+
+    @override_settings(LOCAL_CATALOG_CHECK_INTERVAL=0)
+    def test_reload_on_version_change(self):
+        catalog.get_name(BookAuthorModel, self.author1.pk)
+        # Изменение в другом процессе видно только по версии в базе
+        self.author1.name = "Author1 v2"
+        self.author1.save()
+        response = self.client.get(reverse("book-detail", kwargs={"pk": self.book1.pk}))
+        self.assertEqual(response.json()["author"], "Author1 v2")
+        with self.assertNumQueries(1):
+            catalog.get_name(BookAuthorModel, self.author1.pk)
+
+    def test_unknown_id_reloads(self):
+        catalog.get_name(BookAuthorModel, self.author1.pk)
+        author = BookAuthorModel.objects.create(name="Author3")
+        self.assertEqual(catalog.get_name(BookAuthorModel, author.pk), "Author3")
+        self.assertIsNone(catalog.get_name(BookAuthorModel, 0))
+
+    def test_book_write_validates_by_catalog(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.post(reverse("book-list"), data=self.new_book_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["author"], "Author2")
+        response = self.client.post(reverse("book-list"), data={**self.new_book_data, "genre": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("genre", response.json())
+
+
+@override_settings(BOOK_CACHE_ALIAS="default", SINGLE_FLIGHT_WAIT_TIMEOUT=0.1)
+class SingleFlightTests(BaseReviewRatingSetUp):
+    """Тестирование кэша книг с единственным пересчётом."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.compute = mock.Mock(return_value="value")
+
+    def get_or_compute(self, generation=None):
+        return single_flight.get_or_compute(cache, "key", self.compute, 60, 60, generation)
+
+    def test_computed_once(self):
+        self.assertEqual(self.get_or_compute(), "value")
+        self.assertEqual(self.get_or_compute(), "value")
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_stale_while_recomputing(self):
+        self.get_or_compute(generation=1)
+        cache.add("key:lock", "other", 10)
+        self.compute.return_value = "new value"
+        self.assertEqual(self.get_or_compute(generation=2), "value")
+        cache.delete("key:lock")
+        self.assertEqual(self.get_or_compute(generation=2), "new value")
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_compute_after_wait_timeout(self):
+        cache.add("key:lock", "other", 10)
+        self.assertEqual(self.get_or_compute(), "value")
+        self.assertEqual(cache.get("key:lock"), "other")
+
+    @mock.patch("apps.library.book_cache.transaction.on_commit", lambda func: func())
+    def test_book_detail_cached_until_rating(self):
+        url = reverse("book-detail", kwargs={"pk": self.book1.pk})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["additional_info"]["common_rating"], 8.33)
+
+        BookRatingModel.objects.upsert(self.user2.pk, {self.book1.pk: 4})
+        response = self.client.get(url)
+        self.assertEqual(response.json()["additional_info"]["common_rating"], 7)
+
+    def test_your_rating_added_to_shared_entry(self):
+        self.client.get(reverse("book-list"))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(
+            {book["id"]: book["additional_info"].get("your_rating") for book in response.json()},
+            {self.book1.pk: 8, self.book2.pk: None}
+        )
+
+
+class BookMultiGetTests(BaseReviewRatingSetUp):
+    """Тестирование получения нескольких книг по id."""
+
+    def test_books_in_requested_order(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.get(reverse("book-list"), {"ids": f"{self.book2.pk},0,{self.book1.pk}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual([book["id"] for book in results], [self.book2.pk, self.book1.pk])
+        self.assertEqual(results[1]["additional_info"]["your_rating"], 8)
+        self.assertEqual(response.json()["missing"], [0])
+
+    def test_post_many(self):
+        response = self.client.post(
+            reverse("book-many"), data={"ids": [self.book1.pk, self.book1.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([book["id"] for book in response.json()["results"]], [self.book1.pk])
+
+    def test_fail_too_many_ids(self):
+        with override_settings(BOOKS_MULTI_GET_MAX_IDS=1):
+            response = self.client.get(reverse("book-list"), {"ids": f"{self.book1.pk},{self.book2.pk}"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse("book-list"), {"ids": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BOOK_CACHE_ALIAS="default")
+    def test_shares_detail_cache(self):
+        cache.clear()
+        self.client.get(reverse("book-detail", kwargs={"pk": self.book1.pk}))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("book-list"), {"ids": f"{self.book1.pk},{self.book2.pk}"})
+        book_query, = [query["sql"] for query in context if "library_bookmodel" in query["sql"]]
+        self.assertIn(f'IN ({self.book2.pk})', book_query)
+        self.assertEqual(len(response.json()["results"]), 2)
+        with self.assertNumQueries(0):
+            self.client.get(reverse("book-detail", kwargs={"pk": self.book2.pk}))
+
+    @override_settings(BOOK_CACHE_ALIAS="default", LOCAL_CATALOG_CHECK_INTERVAL=60)
+    def test_new_names_generation_reloads_catalog(self):
+        cache.clear()
+        self.client.get(reverse("book-detail", kwargs={"pk": self.book1.pk}))
+        # Переименование в другом процессе: каталог этого процесса о нём не знает
+        BookAuthorModel.objects.filter(pk=self.author1.pk).update(name="Renamed")
+        cache.delete(book_cache.NAMES_GENERATION_KEY)
+        response = self.client.get(reverse("book-detail", kwargs={"pk": self.book1.pk}))
+        self.assertEqual(response.json()["author"], "Renamed")
+
+
+class DataLoaderTests(BaseReviewRatingSetUp):
+    """Тестирование пакетной загрузки связей в сериализаторах."""
+
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            BookModel.objects.create(
+                title=f"Book{i + 3}", release_year=2020, description="Description",
+                author=self.author1, genre=self.genre1
+            )
+        catalog.get_name(BookAuthorModel, self.author1.pk)
+
+    def test_book_serializer_batches_relations(self):
+        books = list(BookModel.objects.all())
+        # Количество отзывов и общий рейтинг — по запросу на весь список
+        with self.assertNumQueries(2):
+            data = serializers.BookSerializer(books, many=True, context={}).data
+        self.assertEqual(data[0]["additional_info"], {"reviews_count": 2, "common_rating": 8.33})
+        self.assertEqual(data[-1]["additional_info"], {"reviews_count": 0})
+
+    def test_review_serializer_batches_relations(self):
+        reviews = list(BookReviewModel.objects.all())
+        with self.assertNumQueries(2):
+            data = serializers.BookReviewSerializer(reviews, many=True, context={}).data
+        self.assertEqual([review["user"] for review in data], ["SuperUser", "User1"])
+
+    def test_nested_serializers_batch_together(self):
+        class BookWithReviewsSerializer(loaders.BatchLoadMixin, ModelSerializer):
+            reviews = serializers.BookReviewSerializer(many=True, read_only=True)
+
+            class Meta:
+                model = BookModel
+                fields = ("id", "reviews")
+                list_serializer_class = loaders.BatchLoadListSerializer
+
+        # Книги, отзывы, имена юзеров и названия книг
+        with self.assertNumQueries(4):
+            data = BookWithReviewsSerializer(
+                BookModel.objects.prefetch_related("reviews"), many=True, context={}
+            ).data
+        self.assertEqual(data[0]["reviews"][0]["book_title"], "Book1")
+
+    def test_loader_memoized_per_context(self):
+        batch_load = mock.Mock(side_effect=lambda keys: {key: key * 2 for key in keys})
+        context = dict()
+        loader = loaders.get_loader(context, batch_load)
+        loader.prime([1, 2])
+        self.assertEqual(loader.load(1), 2)
+        self.assertIs(loaders.get_loader(context, batch_load), loader)
+        self.assertEqual(loader.load(2), 4)
+        batch_load.assert_called_once()
+
+
+class BookCardsTests(BaseReviewRatingSetUp):
+    """Тестирование списка книг из готовых карточек."""
+
+    def get_list_content(self):
+        response = self.client.get(reverse("book-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content
+
+    def test_list_from_cards(self):
+        with override_settings(BOOK_CARDS_ENABLED=False):
+            expected = self.get_list_content()
+        book_cards.rebuild_all()
+        catalog.get_name(BookAuthorModel, self.author1.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_list_content(), expected)
+
+    def test_fallback_while_cards_missing(self):
+        book_cards.rebuild([self.book1.pk])
+        self.assertEqual(len(json.loads(self.get_list_content())), 2)
+
+    def test_cards_rebuilt_by_outbox(self):
+        book_cards.rebuild_all()
+        BookRatingModel.objects.upsert(self.user1.pk, {self.book2.pk: 1})
+        self.author1.name = "Author1 v2"
+        self.author1.save()
+        catalog.invalidate()
+        outbox.process_batch()
+        books = {book["id"]: book for book in json.loads(self.get_list_content())}
+        self.assertEqual(books[self.book1.pk]["author"], "Author1 v2")
+        self.assertEqual(books[self.book2.pk]["additional_info"]["common_rating"], 4)
+
+    @override_settings(LOCAL_CATALOG_CHECK_INTERVAL=60)
+    def test_cards_rebuilt_with_renamed_author(self):
+        book_cards.rebuild_all()
+        self.get_list_content()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.patch(
+            reverse("author-detail", kwargs={"pk": self.author1.pk}), data={"name": "Renamed"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        outbox.process_batch()
+        self.client.credentials()
+        books = {book["id"]: book for book in json.loads(self.get_list_content())}
+        self.assertEqual(books[self.book1.pk]["author"], "Renamed")
+
+
+class BookPageTests(BaseReviewRatingSetUp):
+    """Тестирование страницы книги одним запросом."""
+
+    def get_page(self, pk):
+        return self.client.get(reverse("book-page", kwargs={"pk": pk}))
+
+    def test_page_by_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.get_page(self.book1.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = response.json()
+        self.assertEqual(page["book"]["title"], "Book1")
+        self.assertEqual(page["author"], {"id": self.author1.pk, "name": "Author1"})
+        self.assertEqual(page["stats"]["ratings_count"], 3)
+        self.assertEqual(page["stats"]["ratings"]["8"], 2)
+        self.assertEqual([review["review"] for review in page["reviews"]["results"]], ["Review1", "Review0"])
+        self.assertEqual(page["user"]["rating"], 8)
+        self.assertEqual(len(page["user"]["review_ids"]), 1)
+
+    def test_page_by_anonymous_user(self):
+        page = self.get_page(self.book2.pk).json()
+        self.assertIsNone(page["user"])
+        self.assertEqual(page["reviews"], {"results": [], "has_more": False})
+
+    def test_fail_page_of_missing_book(self):
+        self.assertEqual(self.get_page(0).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(BOOK_CACHE_ALIAS="default")
+    def test_public_sections_cached(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        self.get_page(self.book1.pk)
+        # Токен, оценки юзера и его отзывы
+        with self.assertNumQueries(3):
+            page = self.get_page(self.book1.pk).json()
+        self.assertEqual(page["stats"]["ratings_count"], 3)
+
+    @override_settings(BOOK_CACHE_ALIAS="default")
+    @mock.patch("apps.library.book_cache.transaction.on_commit", lambda func: func())
+    def test_cached_reviews_updated_on_edit(self):
+        cache.clear()
+        self.get_page(self.book1.pk)
+        review = BookReviewModel.objects.get(book=self.book1, user=self.user1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
+        response = self.client.patch(
+            reverse("review-detail", kwargs={"pk": review.pk}), data={"review": "Edited"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = self.get_page(self.book1.pk).json()
+        self.assertIn("Edited", [review["review"] for review in page["reviews"]["results"]])
+
+
+@override_settings(DELETION_BATCH_SIZE=2)
+class DeletionTests(BaseReviewRatingSetUp):
+    """Тестирование фонового удаления книг и юзеров."""
+
+    def process_outbox(self):
+        while outbox.process_batch():
+            pass
+
+    def test_delete_book_hides_and_purges_in_batches(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.delete(reverse("book-detail", kwargs={"pk": self.book1.pk}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = response.json()
+        self.assertEqual(
+            (job["status"], job["reviews_remaining"], job["ratings_remaining"]), ("pending", 2, 3)
+        )
+
+        response = self.client.get(reverse("book-detail", kwargs={"pk": self.book1.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.client.get(reverse("book-list")).json()), 1)
+
+        outbox.process_batch()
+        progress = self.client.get(reverse("deletion-detail", kwargs={"key": job["key"]})).json()
+        self.assertEqual(progress["status"], "pending")
+        self.assertEqual((progress["ratings_deleted"], progress["ratings_remaining"]), (2, 1))
+
+        self.process_outbox()
+        progress = self.client.get(reverse("deletion-detail", kwargs={"key": job["key"]})).json()
+        self.assertEqual(progress["status"], "done")
+        self.assertEqual((progress["reviews_deleted"], progress["ratings_deleted"]), (2, 3))
+        self.assertFalse(BookModel.objects.filter(pk=self.book1.pk).exists())
+        self.assertTrue(CatalogChangeModel.objects.filter(object_id=self.book1.pk, deleted=True).exists())
+
+    def test_delete_user_keeps_aggregates(self):
+        book_cards.rebuild_all()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user2.key}")
+        response = self.client.delete(
+            f"/auth/users/{self.user2.pk}/", data={"current_password": "user2_password"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.user2.refresh_from_db()
+        self.assertFalse(self.user2.is_active)
+
+        self.process_outbox()
+        self.assertFalse(UserModel.objects.filter(pk=self.user2.pk).exists())
+        self.assertEqual(DeletionJobModel.objects.get().ratings_deleted, 2)
+        self.client.credentials()
+        books = {book["id"]: book for book in self.client.get(reverse("book-list")).json()}
+        self.assertNotIn("common_rating", books[self.book2.pk]["additional_info"])
+        self.assertEqual(books[self.book1.pk]["additional_info"]["reviews_count"], 2)
+
+    def test_admin_delete_is_scheduled(self):
+        self.client.force_login(self.superuser)
+        response = self.client.post(
+            reverse("admin:library_bookmodel_delete", args=[self.book1.pk]), data={"post": "yes"}, follow=True
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, "запущено в фоне")
+        self.assertTrue(BookModel.objects.get(pk=self.book1.pk).hidden)
+        self.assertEqual(DeletionJobModel.objects.get().object_id, self.book1.pk)
+
+        response = self.client.post(reverse("admin:library_bookmodel_changelist"), data={
+            "action": "delete_selected", "_selected_action": [self.book1.pk, self.book2.pk], "post": "yes"
+        }, follow=True)
+        self.assertContains(response, "Запущено фоновое удаление объектов: 2.")
+        self.assertEqual(DeletionJobModel.objects.count(), 2)
+
+    def test_hidden_book_keeps_title_in_reviews(self):
+        deletions.schedule_book(self.book1)
+        review = BookReviewModel.objects.get(user=self.superuser)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_superuser.key}")
+        response = self.client.patch(reverse("review-detail", kwargs={"pk": review.pk}), data={"review": "x"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["book_title"], "Book1")
+
+    def test_deletion_status_by_key(self):
+        job = deletions.schedule_user(self.user1)
+        self.assertEqual(deletions.schedule_user(self.user1), job)
+        response = self.client.get(reverse("deletion-detail", kwargs={"key": job.key}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["object_id"], self.user1.pk)
+        response = self.client.get(reverse("deletion-detail", kwargs={"key": uuid.uuid4()}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ORJSONRendererParserTests(SimpleTestCase):
+    """Тестирование быстрых рендерера и парсера JSON."""
+
+    def test_render_same_as_json_renderer(self):
+        data = {
+            "decimal": decimal.Decimal("4.50"),
+            "datetime": datetime.datetime(2021, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            "naive_datetime": datetime.datetime(2021, 1, 2, 3, 4, 5),
+            "date": datetime.date(2021, 1, 2),
+            "lazy": gettext_lazy("Книга"),
+            "separators": "\u2028\u2029",
+            "unicode": "Отзыв",
+            1: [None, True, 1.5, (1, 2)],
+            "big": 2 ** 70,
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_render_floats(self):
+        data = {"small": 1.5e-7, "big": 1e16}
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, b'{"small":1.5e-7,"big":1e16}')
+        self.assertEqual(json.loads(rendered), json.loads(JSONRenderer().render(data)))
+
+        self.assertEqual(ORJSONRenderer().render([float("nan"), float("inf")]), b"[null,null]")
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float("nan")])
+
+    def test_render_indent_same_as_json_renderer(self):
+        data = {"title": "Book1", "reviews_count": 0}
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            ORJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    def test_render_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_parse(self):
+        stream = io.BytesIO('{"review": "Отзыв", "rating": 5}'.encode())
+        self.assertEqual(ORJSONParser().parse(stream), {"review": "Отзыв", "rating": 5})
+
+    def test_fail_parse_invalid_json(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b"{"))
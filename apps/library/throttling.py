@@ -0,0 +1,156 @@
+import collections
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework import permissions, throttling
+from rest_framework.settings import api_settings
+
+
+class LocalBucketStore:
+    """Хранилище корзин в памяти воркера: ключ -> теоретическое время следующего запроса."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, interval, tolerance, now):
+        with self._lock:
+            allowed, arrival_time = get_arrival_time(self._buckets.get(key), interval, tolerance, now)
+            if allowed:
+                self._buckets[key] = arrival_time
+                self._buckets.move_to_end(key)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            return allowed, arrival_time
+
+
+class CacheBucketStore:
+    """Общее для всех воркеров хранилище в кэше Django: счётчик запросов в окне `tolerance` секунд.
+
+    Счётчик меняется атомарными `add` и `incr`, поэтому одновременные воркеры
+    не затирают друг другу состояние, как при чтении и записи времени GCRA.
+    Цена — на стыке двух окон может пройти до двух лимитов подряд.
+    Возвращается время прихода в терминах GCRA, чтобы заголовки считались одинаково.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def consume(self, key, interval, tolerance, now):
+        window_start = now - now % tolerance
+        window_end = window_start + tolerance
+        cache_key = f"throttle:{key}:{int(window_start)}"
+        timeout = math.ceil(window_end - now) + 1
+        self.cache.add(cache_key, 0, timeout)
+        try:
+            count = self.cache.incr(cache_key)
+        except ValueError:
+            # Запись истекла между add и incr
+            self.cache.add(cache_key, 1, timeout)
+            count = 1
+        if count <= round(tolerance / interval):
+            return True, now + count * interval
+        return False, window_end + tolerance - interval
+
+
+def get_arrival_time(stored_arrival_time, interval, tolerance, now):
+    """Шаг GCRA: разрешён ли запрос и новое теоретическое время прихода.
+
+    Эквивалентно корзине токенов ёмкостью `tolerance / interval`,
+    пополняемой одним токеном за `interval` секунд.
+    """
+    arrival_time = max(stored_arrival_time or now, now) + interval
+    if arrival_time - now > tolerance:
+        return False, arrival_time - interval
+    return True, arrival_time
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.THROTTLE_CACHE_ALIAS:
+                    _store = CacheBucketStore(settings.THROTTLE_CACHE_ALIAS)
+                else:
+                    _store = LocalBucketStore()
+    return _store
+
+
+def reset_store():
+    """Сбрасывает хранилище корзин, например между тестами."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+class TokenBucketThrottle(throttling.BaseThrottle):
+    """Ограничение записи корзиной токенов по `throttle_scope` вьюшки.
+
+    Частота берётся из `DEFAULT_THROTTLE_RATES["<scope>.<kind>"]`, например `"30/min"`:
+    корзина вмещает 30 запросов и пополняется равномерно за минуту.
+    Чтение не ограничивается.
+    """
+    kind = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        if request.method in permissions.SAFE_METHODS or not settings.THROTTLE_ENABLED:
+            return True
+        scope = getattr(view, "throttle_scope", None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}.{self.kind}")
+        if rate is None:
+            return True
+
+        limit, period = self.parse_rate(rate)
+        interval = period / limit
+        now = time.time()
+        allowed, arrival_time = get_store().consume(
+            f"{scope}:{self.kind}:{self.get_key(request)}", interval, period, now
+        )
+        remaining = max(0, math.floor((period - (arrival_time - now)) / interval))
+        self.wait_time = 0 if allowed else arrival_time - period + interval - now
+
+        headers = getattr(request, "throttle_headers", None)
+        if headers is None or remaining < headers["X-RateLimit-Remaining"]:
+            request.throttle_headers = {
+                "X-RateLimit-Limit": limit,
+                "X-RateLimit-Remaining": remaining,
+            }
+        return allowed
+
+    def parse_rate(self, rate):
+        num, period = rate.split("/")
+        return int(num), {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+
+    def wait(self):
+        return self.wait_time
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Корзина токенов на юзера, для анонимов — на IP."""
+    kind = "user"
+
+    def get_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Корзина токенов на IP-адрес."""
+    kind = "ip"
+
+    def get_key(self, request):
+        return self.get_ident(request)
@@ -15,7 +15,15 @@ router.register('authors', views.BookAuthorViewSet, basename="author")
 
 
 urlpatterns = [
-    path("books/<int:pk>/change-count/", views.BookActionsView.as_view(), name="book-change-count")
+    path("books/changes/", views.BookChangesView.as_view(), name="book-changes"),
+    path("books/<int:pk>/page/", views.BookPageView.as_view(), name="book-page"),
+    path("books/<int:pk>/change-count/", views.BookActionsView.as_view(), name="book-change-count"),
+    path("ratings/bulk/", views.BookRatingBulkView.as_view(), name="rating-bulk"),
+    path("deletions/<uuid:key>/", views.DeletionJobView.as_view(), name="deletion-detail"),
+    path("query-stats/", views.QueryStatsView.as_view(), name="query-stats"),
+    path("profiles/", views.ProfileListView.as_view(), name="profile-list"),
+    path("profiles/<str:name>/", views.ProfileDetailView.as_view(), name="profile-detail"),
+    path("profiles/<str:name>/folded/", views.ProfileFoldedView.as_view(), name="profile-folded"),
 ]
 
 urlpatterns += router.urls
@@ -0,0 +1,92 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from apps.library import metrics, models
+
+
+def get_cache():
+    if settings.USER_RATINGS_CACHE_ALIAS:
+        return caches[settings.USER_RATINGS_CACHE_ALIAS]
+    return None
+
+
+def get_version_key(user_id) -> str:
+    return f"user-ratings:version:{user_id}"
+
+
+def get_cache_key(cache, user_id) -> str:
+    """Ключ словаря оценок текущей версии: запись под старой версией никто уже не прочитает."""
+    version_key = get_version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, uuid.uuid4().hex, None)
+        version = cache.get(version_key)
+    return get_versioned_key(user_id, version)
+
+
+def get_versioned_key(user_id, version) -> str:
+    return f"user-ratings:{user_id}:{version}"
+
+
+def load_ratings(user_id) -> dict:
+    """Все оценки юзера из базы: их немного, и один запрос по юзеру дешевле списка id книг."""
+    return dict(models.BookRatingModel.objects.filter(user_id=user_id).values_list("book_id", "rating"))
+
+
+def get_user_ratings(user) -> dict:
+    """Оценки юзера `{book_id: rating}`, из кэша `USER_RATINGS_CACHE_ALIAS`, если он задан."""
+    if user is None or not user.is_authenticated:
+        return dict()
+    cache = get_cache()
+    if cache is None:
+        return load_ratings(user.pk)
+
+    cache_key = get_cache_key(cache, user.pk)
+    ratings = cache.get(cache_key)
+    metrics.observe_cache("user-ratings", ratings is not None)
+    if ratings is None:
+        ratings = load_ratings(user.pk)
+        cache.set(cache_key, ratings, settings.USER_RATINGS_CACHE_TTL)
+    return ratings
+
+
+def get_context_user_ratings(context: dict) -> dict:
+    """Оценки текущего юзера, загружаемые один раз на сериализацию ответа."""
+    if "user_ratings" not in context:
+        user = context.get("current_user")
+        if user is None and "request" in context:
+            user = context["request"].user
+        context["user_ratings"] = get_user_ratings(user)
+    return context["user_ratings"]
+
+
+def update_cached_ratings(user_id):
+    """Записывает свежие оценки юзера в кэш после коммита транзакции.
+
+    Сначала заводится новая версия, потом оценки читаются из базы: последний писатель
+    читает уже после всех закоммиченных записей, и старый словарь не перетрёт новый.
+    """
+    cache = get_cache()
+    if cache is None:
+        return
+
+    def update():
+        version = uuid.uuid4().hex
+        cache.set(get_version_key(user_id), version, None)
+        cache.set(get_versioned_key(user_id, version), load_ratings(user_id), settings.USER_RATINGS_CACHE_TTL)
+
+    transaction.on_commit(update)
+
+
+def invalidate_cached_ratings(user_id):
+    """Сбрасывает версию закэшированных оценок юзера после коммита транзакции.
+
+    Для удалений: при удалении юзера или книги оценки удаляются пачками по строке,
+    и перечитывать словарь на каждую строку незачем.
+    """
+    cache = get_cache()
+    if cache is not None:
+        transaction.on_commit(lambda: cache.delete(get_version_key(user_id)))
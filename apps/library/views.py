@@ -1,36 +1,55 @@
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 
-from rest_framework import views, viewsets
+from rest_framework import status, views, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from apps.library import models, permissions, serializers
+from apps.library import (
+    book_cards, book_page, changes, deletions, metrics, mixins, models, permissions,
+    profiling, serializers, throttling
+)
+from apps.library.queries import endpoint_stats
 from apps.library.serializers import BooksCountSerializer
 
 
-class BookAuthorViewSet(viewsets.ModelViewSet):
+class BookAuthorViewSet(mixins.CacheControlMixin, mixins.ReadSerializerMixin,
+                        viewsets.ModelViewSet):
     """Вьюшка автора книги."""
     queryset = models.BookAuthorModel.objects.all()
     serializer_class = serializers.BookAuthorSerializer
+    read_serializer_class = serializers.BookAuthorReadSerializer
+    query_budget = {"list": 3, "retrieve": 3}
     permission_classes = [
         permissions.IsAdminUser |
         permissions.ReadOnly
     ]
 
 
-class BookGenreViewSet(viewsets.ModelViewSet):
+class BookGenreViewSet(mixins.CacheControlMixin, mixins.ReadSerializerMixin,
+                       viewsets.ModelViewSet):
     """Вьюшка жанра книги."""
     queryset = models.BookGenreModel.objects.all()
     serializer_class = serializers.BookGenreSerializer
+    read_serializer_class = serializers.BookGenreReadSerializer
+    query_budget = {"list": 3, "retrieve": 3}
     permission_classes = [
         permissions.IsAdminUser |
         permissions.ReadOnly
     ]
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(mixins.CacheControlMixin, mixins.BookCacheMixin, mixins.AtomicWriteMixin,
+                  mixins.ReadSerializerMixin, viewsets.ModelViewSet):
     """Вьюшка книги."""
-    queryset = models.BookModel.objects.all()
+    queryset = models.BookModel.objects.visible()
     serializer_class = serializers.BookSerializer
+    read_serializer_class = serializers.BookReadSerializer
+    # +2 на сверку версии и перезагрузку каталога авторов/жанров
+    query_budget = {"list": 5, "retrieve": 5, "many": 5}
     permission_classes = [
         permissions.IsAdminUser |
         permissions.ReadOnly
@@ -41,9 +60,75 @@ class BookViewSet(viewsets.ModelViewSet):
         context["current_user"] = self.request.user
         return context
 
+    def use_book_cards(self) -> bool:
+        """Список по умолчанию для анонимов собирается из готовых карточек книг."""
+        return settings.BOOK_CARDS_ENABLED \
+            and not self.request.user.is_authenticated \
+            and self.use_read_serializer() \
+            and not self.request.query_params
 
-class BookActionsView(views.APIView):
+    def list(self, request, *args, **kwargs):
+        if "ids" in request.query_params:
+            return self.get_many(mixins.get_query_param_list(request, "ids"))
+        if self.use_book_cards():
+            content = book_cards.get_list_json()
+            if content is not None:
+                return HttpResponse(content, content_type="application/json")
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=["post"], permission_classes=[permissions.permissions.AllowAny])
+    def many(self, request, *args, **kwargs):
+        """Несколько книг по `{"ids": [...]}` в теле, для длинных списков."""
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        return self.get_many(ids)
+
+    def destroy(self, request, *args, **kwargs):
+        """Скрывает книгу сразу, отзывы, рейтинги и саму книгу удаляет фоновое задание."""
+        job = deletions.schedule_book(self.get_object())
+        return Response(serializers.DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    def get_many(self, ids):
+        """Книги в порядке `ids` и список id, которых нет."""
+        serializer = serializers.BookIdsSerializer(data={"ids": ids})
+        serializer.is_valid(raise_exception=True)
+        book_ids = serializer.validated_data["ids"]
+        data = self.get_many_data(book_ids)
+        return Response({
+            "results": [data[book_id] for book_id in book_ids if book_id in data],
+            "missing": [book_id for book_id in book_ids if book_id not in data],
+        })
+
+
+class BookChangesView(views.APIView):
+    """Лента изменений каталога после токена `?since=`, с надгробиями удалённых объектов."""
+    query_budget = 6
+    permission_classes = [permissions.ReadOnly]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = changes.parse_token(request.query_params.get("since", "0"))
+            limit = int(request.query_params.get("limit", settings.CHANGES_FEED_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError("Неверный токен since или limit.")
+        limit = max(1, min(limit, settings.CHANGES_FEED_MAX_PAGE_SIZE))
+        return Response(changes.get_changes(since, limit, request))
+
+
+class BookPageView(mixins.CacheControlMixin, views.APIView):
+    """Страница книги одним запросом: книга, автор, статистика оценок, первые отзывы и состояние юзера."""
+    query_budget = 8
+    permission_classes = [permissions.ReadOnly]
+
+    def get(self, request, *args, **kwargs):
+        return Response(book_page.get_page(self.kwargs["pk"], request))
+
+
+class BookActionsView(mixins.ThrottleHeadersMixin, views.APIView):
     """Вьюшка действий к книге."""
+    # +2 на SAVEPOINT/RELEASE транзакции записи
+    query_budget = 8
+    throttle_classes = [throttling.UserTokenBucketThrottle, throttling.IPTokenBucketThrottle]
+    throttle_scope = "book-actions"
     permission_classes = [
         permissions.IsAdminUser |
         permissions.permissions.IsAuthenticated
@@ -51,18 +136,24 @@ class BookActionsView(views.APIView):
 
     def patch(self, request, *args, **kwargs):
         """Добавляет/убавляет количество экземпляров книг `books_count`."""
-        book = get_object_or_404(models.BookModel, pk=self.kwargs["pk"])
+        book = get_object_or_404(models.BookModel.objects.visible(), pk=self.kwargs["pk"])
         serializer = BooksCountSerializer(book, data=request.data)
         if serializer.is_valid(raise_exception=True):
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(status=200)
         return Response(serializer.data)
 
 
-class BookReviewViewSet(viewsets.ModelViewSet):
+class BookReviewViewSet(mixins.ThrottleHeadersMixin, mixins.AtomicWriteMixin,
+                        mixins.ReadSerializerMixin, viewsets.ModelViewSet):
     """Вьюшка отзыва книги."""
     queryset = models.BookReviewModel.objects.all()
     serializer_class = serializers.BookReviewSerializer
+    read_serializer_class = serializers.BookReviewReadSerializer
+    query_budget = {"list": 3, "retrieve": 3}
+    throttle_classes = [throttling.UserTokenBucketThrottle, throttling.IPTokenBucketThrottle]
+    throttle_scope = "reviews"
     permission_classes = [
         permissions.IsAdminUser |
         permissions.IsOwner |
@@ -70,12 +161,148 @@ class BookReviewViewSet(viewsets.ModelViewSet):
     ]
 
 
-class BookRatingViewSet(viewsets.ModelViewSet):
+class BookRatingViewSet(mixins.ThrottleHeadersMixin, mixins.IdempotencyKeyMixin,
+                        mixins.AtomicWriteMixin, mixins.ReadSerializerMixin,
+                        viewsets.ModelViewSet):
     """Вьюшка рейтинга книги."""
     queryset = models.BookRatingModel.objects.all()
     serializer_class = serializers.BookRatingSerializer
+    read_serializer_class = serializers.BookRatingReadSerializer
+    query_budget = {"list": 3, "retrieve": 3}
+    throttle_classes = [throttling.UserTokenBucketThrottle, throttling.IPTokenBucketThrottle]
+    throttle_scope = "ratings"
     permission_classes = [
         permissions.IsAdminUser |
         permissions.IsOwner |
         permissions.ReadOnly
     ]
+
+
+class BookRatingBulkView(mixins.ThrottleHeadersMixin, mixins.IdempotencyKeyMixin, views.APIView):
+    """Вьюшка массовой записи рейтингов текущего юзера."""
+    # +2 на SAVEPOINT/RELEASE транзакции upsert
+    query_budget = 9
+    throttle_classes = [throttling.UserTokenBucketThrottle, throttling.IPTokenBucketThrottle]
+    throttle_scope = "ratings-bulk"
+    permission_classes = [permissions.permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        return self.run_idempotent(self.save_ratings, request, *args, **kwargs)
+
+    def save_ratings(self, request, *args, **kwargs):
+        """Принимает список `{book, rating}` и возвращает результат по каждому элементу.
+
+        Книги проверяются одним запросом, рейтинги пишутся одним upsert.
+        Ошибки отдельных элементов не мешают записи остальных.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError("Ожидается список рейтингов.")
+        if len(items) > settings.RATINGS_BULK_MAX_ITEMS:
+            raise ValidationError(f"Не больше {settings.RATINGS_BULK_MAX_ITEMS} рейтингов за запрос.")
+
+        results = []
+        ratings = dict()
+        for item in items:
+            item_serializer = serializers.BookRatingBulkItemSerializer(data=item)
+            if not item_serializer.is_valid():
+                results.append({"status": "error", "errors": item_serializer.errors})
+                continue
+            book_id = item_serializer.validated_data["book"]
+            if book_id in ratings:
+                results.append({"book": book_id, "status": "error",
+                                 "errors": {"book": ["Книга повторяется в запросе."]}})
+                continue
+            ratings[book_id] = item_serializer.validated_data["rating"]
+            results.append({"book": book_id})
+
+        existing_book_ids = set(
+            models.BookModel.objects.visible().filter(pk__in=ratings).values_list("pk", flat=True)
+        )
+        for book_id in ratings.keys() - existing_book_ids:
+            del ratings[book_id]
+
+        upserted = {
+            result.book_id: result
+            for result in models.BookRatingModel.objects.upsert(request.user.pk, ratings)
+        }
+
+        for result in results:
+            if "status" in result:
+                continue
+            upsert_result = upserted.get(result["book"])
+            if upsert_result is None:
+                result.update(status="error", errors={"book": ["Книга не найдена."]})
+            else:
+                result.update(
+                    id=upsert_result.id,
+                    rating=upsert_result.rating,
+                    status="created" if upsert_result.created
+                    else "updated" if upsert_result.changed else "unchanged"
+                )
+        return Response(results, status=status.HTTP_200_OK)
+
+
+class DeletionJobView(views.APIView):
+    """Прогресс фонового удаления книги или юзера по ключу из ответа на удаление.
+
+    Ключ случайный, поэтому статус доступен без входа: удалённый юзер уже не может войти.
+    """
+    query_budget = 4
+    permission_classes = [permissions.permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(models.DeletionJobModel, key=self.kwargs["key"])
+        return Response(serializers.DeletionJobSerializer(job).data)
+
+
+class QueryStatsView(views.APIView):
+    """Статистика SQL-запросов по эндпоинтам текущего процесса."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(endpoint_stats.export())
+
+
+class ProfileListView(views.APIView):
+    """Список сохранённых профилей медленных запросов по метаданным файлов, без их чтения."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        profiles = []
+        for entry in profiling.scan_profiles():
+            try:
+                profiles.append(profiling.get_profile_info(entry))
+            except FileNotFoundError:
+                pass
+        return Response(profiles)
+
+
+class ProfileDetailView(views.APIView):
+    """Профиль медленного запроса: стеки и SQL."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        profile = profiling.load_profile(self.kwargs["name"])
+        if profile is None:
+            raise Http404
+        return Response(profile)
+
+
+class ProfileFoldedView(views.APIView):
+    """Скачивание профиля в формате folded stacks для построения flamegraph."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        name = self.kwargs["name"]
+        profile = profiling.load_profile(name)
+        if profile is None:
+            raise Http404
+        response = HttpResponse(profiling.get_folded_profile(profile), content_type="text/plain")
+        response["Content-Disposition"] = f'attachment; filename="{name[:-len(".json")]}.folded"'
+        return response
+
+
+def metrics_view(request):
+    """Метрики Prometheus для внутреннего сбора, снаружи закрыты в nginx."""
+    return HttpResponse(metrics.generate_metrics(), content_type=metrics.CONTENT_TYPE)
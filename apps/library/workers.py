@@ -0,0 +1,61 @@
+import datetime
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class QueueWorkerCommand(BaseCommand):
+    """Команда воркера очереди в базе: пачки до опустошения очереди, пауза, когда она пуста,
+    и раз в `purge_interval` секунд чистка старых записей.
+
+    SIGTERM и SIGINT завершают воркер после текущей пачки, не прерывая её.
+    Наследник задаёт `process_batch`, `purge` и название записей `item_name`.
+    """
+    default_batch_size = 100
+    item_name = "items"
+    purge_interval = 60 * 60
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=self.default_batch_size)
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Пауза в секундах, когда очередь пуста.")
+        parser.add_argument("--max-attempts", type=int, default=10)
+        parser.add_argument("--retention-days", type=int, default=7,
+                            help="Сколько дней хранить обработанные записи.")
+        parser.add_argument("--once", action="store_true",
+                            help="Разобрать очередь и выйти.")
+
+    def process_batch(self, batch_size: int, max_attempts: int) -> int:
+        raise NotImplementedError
+
+    def purge(self, older_than: datetime.timedelta):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        previous_handlers = {
+            signum: signal.signal(signum, lambda *_: stopping.set())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            self.run(options, stopping)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    def run(self, options, stopping: threading.Event):
+        retention = datetime.timedelta(days=options["retention_days"])
+        last_purge = None
+        while not stopping.is_set():
+            processed = self.process_batch(options["batch_size"], options["max_attempts"])
+            if processed:
+                self.stdout.write(f"Processed {processed} {self.item_name}")
+            if last_purge is None or time.monotonic() - last_purge > self.purge_interval:
+                self.purge(retention)
+                last_purge = time.monotonic()
+            if processed < options["batch_size"]:
+                if options["once"]:
+                    return
+                stopping.wait(options["poll_interval"])
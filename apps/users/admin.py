@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+
+from apps.library import deletions
+from apps.library.admin import BackgroundDeleteAdminMixin, LargeTableAdmin
+from apps.library.models import UserModel
+from apps.users import models
+
+
+admin.site.unregister(UserModel)
+
+
+@admin.register(UserModel)
+class UserAdmin(BackgroundDeleteAdminMixin, BaseUserAdmin):
+    """Админка юзера с фоновым удалением отзывов и рейтингов."""
+    schedule_deletion = staticmethod(deletions.schedule_user)
+
+
+@admin.register(models.QueuedEmailModel)
+class QueuedEmailAdmin(LargeTableAdmin):
+    """Админка письма в очереди."""
+    list_display = ("id", "__str__", "created_at", "attempts", "sent_at")
+    list_display_links = ("id", "__str__")
@@ -0,0 +1,151 @@
+import base64
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from apps.library import outbox
+from apps.users import models
+
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_message(message) -> dict:
+    """Письмо в JSON для очереди. Вложения поддерживаются только вида `(имя, содержимое, тип)`."""
+    attachments = []
+    for filename, content, mimetype in message.attachments:
+        is_bytes = isinstance(content, bytes)
+        attachments.append({
+            "filename": filename,
+            "content": base64.b64encode(content).decode() if is_bytes else content,
+            "mimetype": mimetype,
+            "base64": is_bytes,
+        })
+    return {
+        "subject": str(message.subject),
+        "body": str(message.body),
+        "from_email": message.from_email,
+        "to": list(message.to),
+        "cc": list(message.cc),
+        "bcc": list(message.bcc),
+        "reply_to": list(message.reply_to),
+        "headers": message.extra_headers,
+        "content_subtype": message.content_subtype,
+        "alternatives": [list(alternative) for alternative in getattr(message, "alternatives", ())],
+        "attachments": attachments,
+    }
+
+
+def deserialize_message(data: dict, connection=None) -> EmailMultiAlternatives:
+    message = EmailMultiAlternatives(
+        subject=data["subject"], body=data["body"], from_email=data["from_email"],
+        to=data["to"], cc=data["cc"], bcc=data["bcc"], reply_to=data["reply_to"],
+        headers=data["headers"], connection=connection,
+        alternatives=[tuple(alternative) for alternative in data["alternatives"]],
+    )
+    message.content_subtype = data["content_subtype"]
+    for attachment in data["attachments"]:
+        content = attachment["content"]
+        if attachment["base64"]:
+            content = base64.b64decode(content)
+        message.attach(attachment["filename"], content, attachment["mimetype"])
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который складывает письма в очередь в базе вместо отправки."""
+
+    def send_messages(self, email_messages):
+        emails = [
+            models.QueuedEmailModel(message=serialize_message(message))
+            for message in email_messages if message.recipients()
+        ]
+        try:
+            models.QueuedEmailModel.objects.bulk_create(emails)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(emails)
+
+
+class QueuedEmailMixin:
+    """Миксин письма, которое всегда ставится в очередь, а не отправляется сразу."""
+
+    def get_connection(self, fail_silently=False):
+        if not self.connection:
+            self.connection = QueuedEmailBackend(fail_silently=fail_silently)
+        return self.connection
+
+
+def claim_batch(batch_size, max_attempts, now) -> list:
+    """Забирает пачку готовых писем в короткой транзакции.
+
+    Попытка засчитывается сразу, а письмо откладывается на `QUEUED_EMAIL_CLAIM_TIMEOUT` секунд:
+    другие воркеры его не возьмут, а если воркер упадёт, письмо вернётся в очередь.
+    Несколько воркеров не мешают друг другу: строки берутся с `SKIP LOCKED`.
+    """
+    with transaction.atomic():
+        emails = list(
+            models.QueuedEmailModel.objects
+            .select_for_update(skip_locked=True)
+            .filter(sent_at__isnull=True, available_at__lte=now, attempts__lt=max_attempts)
+            .order_by("id")[:batch_size]
+        )
+        for email in emails:
+            email.attempts += 1
+            email.available_at = now + datetime.timedelta(seconds=settings.QUEUED_EMAIL_CLAIM_TIMEOUT)
+        models.QueuedEmailModel.objects.bulk_update(emails, ["attempts", "available_at"])
+    return emails
+
+
+def retry_later(email, exc, now):
+    email.last_error = repr(exc)
+    email.available_at = now + outbox.get_retry_delay(email.attempts)
+
+
+def send_batch(batch_size=100, max_attempts=10) -> int:
+    """Отправляет пачку готовых писем через одно соединение `QUEUED_EMAIL_BACKEND`.
+
+    Почтовый сервер ждётся вне транзакции: строки забираются и отмечаются отдельно.
+    Неудачные письма повторяются с экспоненциальной задержкой, каждое отдельно.
+    """
+    emails = claim_batch(batch_size, max_attempts, timezone.now())
+    if not emails:
+        return 0
+
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.exception("Failed to open email connection")
+        for email in emails:
+            retry_later(email, exc, timezone.now())
+    else:
+        try:
+            for email in emails:
+                try:
+                    connection.send_messages([deserialize_message(email.message, connection)])
+                except Exception as exc:
+                    logger.exception("Failed to send queued email %s", email.pk)
+                    retry_later(email, exc, timezone.now())
+                else:
+                    email.sent_at = timezone.now()
+        finally:
+            connection.close()
+
+    models.QueuedEmailModel.objects.bulk_update(emails, ["last_error", "available_at", "sent_at"])
+    return len(emails)
+
+
+def purge_sent(older_than: datetime.timedelta) -> int:
+    """Удаляет отправленные письма старше `older_than`."""
+    deleted, _ = models.QueuedEmailModel.objects \
+        .filter(sent_at__lt=timezone.now() - older_than) \
+        .delete()
+    return deleted
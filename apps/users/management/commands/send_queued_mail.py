@@ -0,0 +1,14 @@
+from apps.library.workers import QueueWorkerCommand
+from apps.users import mail
+
+
+class Command(QueueWorkerCommand):
+    help = "Отправляет письма из очереди: активация, сброс пароля и другие письма djoser."
+    default_batch_size = 50
+    item_name = "emails"
+
+    def process_batch(self, batch_size, max_attempts):
+        return mail.send_batch(batch_size, max_attempts)
+
+    def purge(self, older_than):
+        mail.purge_sent(older_than)
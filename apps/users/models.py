@@ -0,0 +1,27 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class QueuedEmailModel(models.Model):
+    """Модель письма в очереди на отправку `manage.py send_queued_mail`."""
+    message = models.JSONField("Письмо")
+    created_at = models.DateTimeField("Создано", auto_now_add=True)
+    available_at = models.DateTimeField("Доступно для отправки", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField("Попытки", default=0)
+    sent_at = models.DateTimeField("Отправлено", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+
+    def __str__(self):
+        return f"{self.pk}: {self.message.get('subject', '')}"
+
+    class Meta:
+        verbose_name = "Письмо в очереди"
+        verbose_name_plural = "Письма в очереди"
+        indexes = [
+            models.Index(
+                fields=["available_at"],
+                condition=Q(sent_at__isnull=True),
+                name="queued_email_pending_idx"
+            ),
+        ]
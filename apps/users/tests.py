@@ -1,8 +1,18 @@
+import io
+from unittest import mock
+
+from django.core import mail as django_mail
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
 from apps.library.models import UserModel
+from apps.users import mail
+from apps.users.models import QueuedEmailModel
 
 
 class BaseUserSetUp(APITestCase):
@@ -91,7 +101,7 @@ class UserTests(BaseUserSetUp):
             f"/auth/users/{self.user1.pk}/",
             data={"current_password": "superuser_password"}
         )
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_delete_user_by_owner(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user1.key}")
@@ -99,7 +109,7 @@ class UserTests(BaseUserSetUp):
             f"/auth/users/{self.user1.pk}/",
             data={"current_password": "user1_password"}
         )
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
 
     def test_fail_delete_user_by_another_user(self):
         self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token_user2.key}")
@@ -115,3 +125,57 @@ class UserTests(BaseUserSetUp):
             data={"current_password": "user1_password"}
         )
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(QUEUED_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class EmailQueueTests(BaseUserSetUp):
+    """Тестирование очереди писем djoser."""
+
+    def register(self):
+        response = self.client.post("/auth/users/", data={
+            "username": "NewUser", "email": "new@example.com", "password": "NeWPa$$w0Rd"
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_activation_email_queued(self):
+        self.register()
+        self.assertEqual(django_mail.outbox, [])
+        self.assertEqual(QueuedEmailModel.objects.count(), 1)
+
+        self.assertEqual(mail.send_batch(), 1)
+        message, = django_mail.outbox
+        self.assertEqual(message.to, ["new@example.com"])
+        self.assertEqual(message.alternatives[0][1], "text/html")
+        self.assertIsNotNone(QueuedEmailModel.objects.get().sent_at)
+        self.assertEqual(mail.send_batch(), 0)
+
+    def test_failed_email_retried_later(self):
+        self.register()
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages",
+                        side_effect=ConnectionError("smtp down")):
+            self.assertEqual(mail.send_batch(), 1)
+        email = QueuedEmailModel.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNone(email.sent_at)
+        self.assertGreater(email.available_at, timezone.now())
+        self.assertEqual(mail.send_batch(), 0)
+
+    def test_send_queued_mail_command(self):
+        self.register()
+        output = io.StringIO()
+        call_command("send_queued_mail", "--once", stdout=output)
+        self.assertEqual(output.getvalue(), "Processed 1 emails\n")
+        self.assertEqual(len(django_mail.outbox), 1)
+
+    def test_claimed_email_skipped(self):
+        self.register()
+        email, = mail.claim_batch(100, 10, timezone.now())
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(mail.send_batch(), 0)
+        self.assertEqual(django_mail.outbox, [])
+
+    @override_settings(ADMINS=[("Admin", "admin@example.com")])
+    def test_admin_email_not_queued(self):
+        django_mail.mail_admins("Error", "Traceback")
+        self.assertEqual(len(django_mail.outbox), 1)
+        self.assertFalse(QueuedEmailModel.objects.exists())
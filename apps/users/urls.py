@@ -0,0 +1,9 @@
+from rest_framework.routers import DefaultRouter
+
+from apps.users import views
+
+
+router = DefaultRouter()
+router.register("users", views.UserViewSet)
+
+urlpatterns = router.urls
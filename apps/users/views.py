@@ -0,0 +1,20 @@
+from djoser import views as djoser_views
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.library import deletions, serializers
+
+
+class UserViewSet(djoser_views.UserViewSet):
+    """Юзеры djoser: удаление отключает юзера сразу,
+    отзывы, рейтинги и самого юзера удаляет фоновое задание.
+    """
+
+    def perform_destroy(self, instance):
+        self.deletion_job = deletions.schedule_user(instance)
+
+    def destroy(self, request, *args, **kwargs):
+        super().destroy(request, *args, **kwargs)
+        return Response(
+            serializers.DeletionJobSerializer(self.deletion_job).data, status=status.HTTP_202_ACCEPTED
+        )
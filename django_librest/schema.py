@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.templatetags.static import static
+from django.urls import reverse
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import ReDocRenderer, SwaggerJSONRenderer, SwaggerUIRenderer
+from drf_yasg.views import SPEC_RENDERERS, get_schema_view
+from rest_framework import permissions
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+
+MANIFEST_NAME = 'manifest.json'
+
+api_info = openapi.Info(
+   title="Library API",
+   default_version='v1',
+   description="Books for everyone!",
+   contact=openapi.Contact(email="fra1tube@gmail.com"),
+   license=openapi.License(name="MIT License"),
+)
+
+schema_view = get_schema_view(
+   api_info,
+   public=True,
+   permission_classes=(permissions.AllowAny,)
+)
+
+
+def generate_schema() -> bytes:
+    """Генерирует публичную схему OpenAPI в JSON, как её отдаёт `/swagger.json` анониму.
+
+    Хост и схема URL не пишутся, UI подставляет адрес страницы.
+    """
+    request = APIView().initialize_request(APIRequestFactory().get(reverse('schema-json')))
+    schema = OpenAPISchemaGenerator(api_info).get_schema(request=request, public=True)
+    schema.pop('host', None)
+    schema.pop('schemes', None)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def read_manifest() -> dict:
+    try:
+        with open(os.path.join(settings.API_SCHEMA_DIR, MANIFEST_NAME)) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return dict()
+
+
+def write_schema(content: bytes) -> str:
+    """Записывает схему в `API_SCHEMA_DIR` под именем с хешем содержимого.
+
+    Файлы старше предыдущей версии удаляются, чтобы открытые страницы
+    документации могли догрузить схему во время выкладки.
+    """
+    schema_dir = settings.API_SCHEMA_DIR
+    os.makedirs(schema_dir, exist_ok=True)
+    name = f"openapi.{hashlib.sha256(content).hexdigest()[:12]}.json"
+    previous_name = read_manifest().get('openapi')
+
+    for file_name, file_content in ((name, content),
+                                    (MANIFEST_NAME, json.dumps({'openapi': name}).encode())):
+        temporary_path = os.path.join(schema_dir, f".{file_name}")
+        with open(temporary_path, 'wb') as file:
+            file.write(file_content)
+        os.replace(temporary_path, os.path.join(schema_dir, file_name))
+
+    for file_name in os.listdir(schema_dir):
+        if file_name.startswith('openapi.') and file_name not in (name, previous_name):
+            os.remove(os.path.join(schema_dir, file_name))
+    return name
+
+
+def get_spec_url() -> str:
+    """Адрес схемы для UI: собранный файл в статике или генерация с кэшем в памяти."""
+    name = read_manifest().get('openapi')
+    if name is not None:
+        return static(f"{os.path.relpath(settings.API_SCHEMA_DIR, settings.STATIC_ROOT)}/{name}")
+    return reverse('schema-json')
+
+
+class StaticSpecSwaggerUIRenderer(SwaggerUIRenderer):
+
+    def get_swagger_ui_settings(self):
+        return {**super().get_swagger_ui_settings(), 'url': get_spec_url()}
+
+
+class StaticSpecReDocRenderer(ReDocRenderer):
+
+    def get_redoc_settings(self):
+        return {**super().get_redoc_settings(), 'url': get_spec_url()}
+
+
+UI_RENDERERS = {
+    'swagger': (StaticSpecSwaggerUIRenderer, StaticSpecReDocRenderer),
+    'redoc': (StaticSpecReDocRenderer, StaticSpecSwaggerUIRenderer),
+}
+
+
+def get_ui_view(renderer):
+    return schema_view.as_cached_view(
+        settings.API_SCHEMA_CACHE_TIMEOUT,
+        renderer_classes=UI_RENDERERS[renderer] + SPEC_RENDERERS
+    )
+
+
+def get_spec_view():
+    return schema_view.as_cached_view(
+        settings.API_SCHEMA_CACHE_TIMEOUT, renderer_classes=(SwaggerJSONRenderer,)
+    )
@@ -26,6 +26,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.library.middleware.MetricsMiddleware',
+    'apps.library.middleware.ProfilerMiddleware',
+    'apps.library.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,10 +83,155 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.library.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.library.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'ratings.user': '30/min',
+        'ratings.ip': '120/min',
+        'reviews.user': '10/min',
+        'reviews.ip': '60/min',
+        'book-actions.user': '60/min',
+        'book-actions.ip': '240/min',
+        'ratings-bulk.user': '10/min',
+        'ratings-bulk.ip': '60/min',
+    },
 }
 
 
+# Swagger/ReDoc (drf_yasg is imported on the first docs request)
+
+API_DOCS_ENABLED = True
+
+# Pre-built OpenAPI schema from `manage.py build_schema` (served by nginx),
+# generated on demand and kept in the cache for API_SCHEMA_CACHE_TIMEOUT when absent
+API_SCHEMA_DIR = BASE_DIR / 'static' / 'schema'
+API_SCHEMA_CACHE_TIMEOUT = 60 * 60
+
+
+# Caches: 'default' is per process, 'shared' is a table in the main DB seen by all
+# workers (created by `manage.py createcachetable`)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'librest_cache',
+    },
+}
+
+
+# Cache-Control for anonymous catalog GETs (drives the nginx microcache)
+
+CATALOG_CACHE_MAX_AGE = 5
+CATALOG_CACHE_STALE_WHILE_REVALIDATE = 30
+
+
+# Token bucket throttling (None — in-memory per worker, else a shared cache alias
+# holding an atomic fixed-window counter per key)
+
+THROTTLE_ENABLED = True
+THROTTLE_CACHE_ALIAS = None
+
+
+# Idempotency-Key for write retries (the alias must be shared by all workers:
+# a retry may land on another uWSGI process)
+
+IDEMPOTENCY_CACHE_ALIAS = 'shared'
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+
+# Per-user rating maps for your_rating (None — loaded once per request, else a shared cache alias)
+
+USER_RATINGS_CACHE_ALIAS = None
+USER_RATINGS_CACHE_TTL = 60 * 60
+
+
+# Book list/detail responses (None — off, else a cache alias shared by all workers).
+# A stale entry is served for up to BOOK_CACHE_STALE_TTL seconds while one worker recomputes it,
+# on a miss the others wait up to SINGLE_FLIGHT_WAIT_TIMEOUT seconds for its result
+
+BOOK_CACHE_ALIAS = None
+BOOK_CACHE_TTL = 60
+BOOK_CACHE_STALE_TTL = 5 * 60
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+SINGLE_FLIGHT_WAIT_TIMEOUT = 2
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+
+# Catalog change feed (on PostgreSQL entries are held back while an older transaction
+# is still open, so changes committing out of sequence order are not skipped)
+
+CHANGES_FEED_PAGE_SIZE = 100
+CHANGES_FEED_MAX_PAGE_SIZE = 1000
+
+
+# Authors/genres cached in worker memory (the shared version is re-checked
+# against the change feed at most every LOCAL_CATALOG_CHECK_INTERVAL seconds)
+
+LOCAL_CATALOG_CHECK_INTERVAL = 1
+
+
+# Anonymous book list assembled from pre-rendered cards (`manage.py build_book_cards`,
+# kept up to date by the outbox worker); falls back to the serializer while cards are missing
+
+BOOK_CARDS_ENABLED = True
+
+
+# Book page (books/<pk>/page/)
+
+BOOK_PAGE_REVIEWS = 10
+
+
+# Multi-get of books (`?ids=1,2,3` or POST books/many/)
+
+BOOKS_MULTI_GET_MAX_IDS = 100
+
+
+# Background deletes of books and users: reviews and ratings are purged by the outbox worker
+# in batches of this size per transaction (delete signals run per row), progress at deletions/<key>/
+
+DELETION_BATCH_SIZE = 100
+
+
+# Bulk ratings
+
+RATINGS_BULK_MAX_ITEMS = 100
+
+
+# SQL query budget
+
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGET_DUPLICATES_THRESHOLD = 5
+
+
+# Sampling profiler
+
+PROFILER_ENABLED = False
+PROFILER_SLOW_REQUEST_THRESHOLD = 1.0
+PROFILER_INTERVAL = 0.005
+PROFILER_DIR = BASE_DIR / 'profiles'
+PROFILER_MAX_FILES = 100
+
+
+# Email: djoser letters (activation, password reset) are queued in the DB
+# and sent by `manage.py send_queued_mail` through QUEUED_EMAIL_BACKEND,
+# the rest (mail_admins error reports) go through EMAIL_BACKEND directly
+
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+QUEUED_EMAIL_CLAIM_TIMEOUT = 300
+
+
 # Djoser
 
 DJOSER = {
@@ -91,6 +239,14 @@ DJOSER = {
     'USERNAME_RESET_CONFIRM_URL': 'users/username/reset/confirm/{uid}/{token}',
     'ACTIVATION_URL': 'users/activation/{uid}/{token}',
     'SEND_ACTIVATION_EMAIL': True,
+    'EMAIL': {
+        'activation': 'apps.users.email.ActivationEmail',
+        'confirmation': 'apps.users.email.ConfirmationEmail',
+        'password_reset': 'apps.users.email.PasswordResetEmail',
+        'password_changed_confirmation': 'apps.users.email.PasswordChangedConfirmationEmail',
+        'username_changed_confirmation': 'apps.users.email.UsernameChangedConfirmationEmail',
+        'username_reset': 'apps.users.email.UsernameResetEmail',
+    },
 }
 
 
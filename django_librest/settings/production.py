@@ -1,5 +1,7 @@
 from os import environ
 
+from .common import INSTALLED_APPS
+
 
 DEBUG = False
 ALLOWED_HOSTS = ["*"]
@@ -34,3 +36,16 @@ DATABASES = {
         'PORT': POSTGRES_PORT,
     }
 }
+
+
+# Swagger/ReDoc
+
+API_DOCS_ENABLED = environ.get('API_DOCS_ENABLED', '1') == '1'
+
+if not API_DOCS_ENABLED:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'drf_yasg']
+
+
+# Sampling profiler
+
+PROFILER_ENABLED = environ.get('PROFILER_ENABLED') == '1'
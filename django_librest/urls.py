@@ -1,15 +1,20 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
-from django_librest.yasg import urlpatterns as doc_urls
+from apps.library.views import metrics_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
-    path('auth/', include('djoser.urls')),
+    path('auth/', include('apps.users.urls')),
     path('auth/', include('djoser.urls.authtoken')),
     path('api/v1/', include('apps.library.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
-urlpatterns += doc_urls
+if settings.API_DOCS_ENABLED:
+    from django_librest.yasg import urlpatterns as doc_urls
+
+    urlpatterns += doc_urls
@@ -1,8 +1,22 @@
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_librest.settings')
 
 application = get_wsgi_application()
+
+# Import the URLconf and views up front: uWSGI loads this module in the master
+# and forks workers that are already warmed up
+get_resolver().url_patterns
+
+try:
+    import uwsgi
+except ImportError:
+    pass
+else:
+    from apps.library.metrics import mark_process_dead
+
+    uwsgi.atexit = mark_process_dead
@@ -1,21 +1,23 @@
 from django.urls import path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Library API",
-      default_version='v1',
-      description="Books for everyone!",
-      contact=openapi.Contact(email="fra1tube@gmail.com"),
-      license=openapi.License(name="MIT License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,)
-)
+
+def lazy_view(factory_name, *args):
+    """Вьюшка документации; drf_yasg импортируется только при первом запросе к ней."""
+    view = None
+
+    def wrapper(request, *view_args, **view_kwargs):
+        nonlocal view
+        if view is None:
+            from django_librest import schema
+
+            view = getattr(schema, factory_name)(*args)
+        return view(request, *view_args, **view_kwargs)
+
+    return wrapper
+
 
 urlpatterns = [
-   path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-   path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+   path('swagger/', lazy_view('get_ui_view', 'swagger'), name='schema-swagger-ui'),
+   path('redoc/', lazy_view('get_ui_view', 'redoc'), name='schema-redoc'),
+   path('swagger.json', lazy_view('get_spec_view'), name='schema-json'),
 ]
@@ -8,6 +8,15 @@ done
 
 echo "PostgreSQL started"
 
+# Shared directory for Prometheus metrics of all uWSGI workers
+export PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+chown app:app "$PROMETHEUS_MULTIPROC_DIR"
+
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py createcachetable
+python manage.py build_schema
+python manage.py build_book_cards
 exec uwsgi config/uwsgi.ini